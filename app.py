@@ -1,11 +1,26 @@
 import streamlit as st
 import os
 import json
-from datetime import datetime
-import sqlite3
-from fpdf import FPDF
-import unicodedata
-from bot import init_db, generate_questions, evaluate_answer, generate_summary
+import time
+import hmac
+from datetime import datetime, timedelta
+from bot import evaluate_answer_stream, generate_summary_stream, parse_score, get_client_error
+from db import ensure_schema, find_answer, load_history_page, load_history_since, load_top_leaderboard, load_score_trend, load_cohort_trend, search_history, SEARCH_PAGE_SIZE
+from write_buffer import record_answer, flush as flush_writes
+from prefetch import prefetch_questions, take_questions
+from evaluation_queue import EvaluationQueue, evaluate_all
+from timer import start_question_timer, timer_expired, render_countdown
+import inference
+import metrics
+import storage
+import export
+from session_store import TextSeq, new_session_id, touch as touch_session, discard as discard_session, save_snapshot, load_snapshot, SNAPSHOT_KINDS
+
+# Timed from here to the end of the script; reruns cut short by st.rerun()/st.stop() aren't recorded
+rerun_started = time.perf_counter()
+# Hidden admin panel: open the app with ?admin=1&token=<ADMIN_TOKEN>
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+TREND_DAYS = 90  # window of the progress chart on the summary page
 
 # Set page configuration
 st.set_page_config(page_title="Interview Simulator", layout="wide")
@@ -32,7 +47,10 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Initialize session state
+# Initialize session state. Questions, answers, feedback and digests are TextSeqs:
+# only row IDs live here, the texts are in SQLite (see session_store.py)
+if "session_id" not in st.session_state:
+    st.session_state.session_id = new_session_id()
 if "step" not in st.session_state:
     st.session_state.step = "selection"
 if "role" not in st.session_state:
@@ -46,140 +64,154 @@ if "question_set" not in st.session_state:
 if "difficulty" not in st.session_state:
     st.session_state.difficulty = "Medium"
 if "questions" not in st.session_state:
-    st.session_state.questions = []
+    st.session_state.questions = TextSeq(st.session_state.session_id)
 if "current_question_index" not in st.session_state:
     st.session_state.current_question_index = 0
 if "responses" not in st.session_state:
-    st.session_state.responses = []
+    st.session_state.responses = TextSeq(st.session_state.session_id)
 if "feedbacks" not in st.session_state:
-    st.session_state.feedbacks = []
+    st.session_state.feedbacks = TextSeq(st.session_state.session_id)
 if "scores" not in st.session_state:
     st.session_state.scores = []
+if "digests" not in st.session_state:
+    # Short per-question notes produced after each evaluation; the summary merges these
+    st.session_state.digests = TextSeq(st.session_state.session_id)
 if "summary" not in st.session_state:
     st.session_state.summary = None
 if "user_id" not in st.session_state:
     st.session_state.user_id = ""
 if "show_all_history" not in st.session_state:
     st.session_state.show_all_history = False
-if "timer" not in st.session_state:
-    st.session_state.timer = 300  # 5 minutes per question
-
-# Initialize database
-init_db()
-
-# Functions for history and leaderboard
-def load_history(user_id):
-    conn = sqlite3.connect("interview.db")
-    c = conn.cursor()
-    c.execute("SELECT * FROM history WHERE user_id = ? ORDER BY timestamp DESC", (user_id,))
-    history = [
-        {
-            "timestamp": row[1],
-            "role": row[2],
-            "mode": row[3],
-            "question_set": row[4],
-            "question": row[5],
-            "answer": row[6],
-            "feedback": row[7],
-            "score": row[8]
-        } for row in c.fetchall()
-    ]
-    conn.close()
-    return history
+if "history_pages" not in st.session_state:
+    # Older history pages fetched by "Show More": (user_id, boundary, entries, cursor)
+    st.session_state.history_pages = None
+if "question_deadline" not in st.session_state:
+    st.session_state.question_deadline = None
+if "evaluations" not in st.session_state:
+    st.session_state.evaluations = EvaluationQueue()
+if "exam_mode" not in st.session_state:
+    st.session_state.exam_mode = False
+if "exam_answers" not in st.session_state:
+    # Exam mode: (question index, history entry) for each answer awaiting grading
+    st.session_state.exam_answers = []
+if "question_warning" not in st.session_state:
+    # Why this interview got placeholder questions, if it did; shown until the next Start
+    st.session_state.question_warning = None
 
-def save_history(user_id, entry):
-    conn = sqlite3.connect("interview.db")
-    c = conn.cursor()
-    c.execute(
-        "INSERT INTO history (user_id, timestamp, role, mode, question_set, question, answer, feedback, score) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
-        (
-            user_id,
-            entry["timestamp"],
-            entry["role"],
-            entry["mode"],
-            entry["question_set"],
-            entry["question"],
-            entry["answer"],
-            entry["feedback"],
-            entry["score"]
-        )
-    )
-    conn.commit()
-    conn.close()
+# Initialize database (schema setup runs once per process)
+ensure_schema()
+touch_session(st.session_state.session_id)
+# Prometheus endpoint, only when METRICS_PORT is set (started once per process)
+metrics.serve()
 
-def load_leaderboard():
-    conn = sqlite3.connect("interview.db")
-    c = conn.cursor()
-    c.execute("SELECT user_id, total_score, attempts FROM leaderboard")
-    leaderboard = [
-        {"user_id": row[0], "total_score": row[1], "attempts": row[2]}
-        for row in c.fetchall()
-    ]
-    conn.close()
-    return leaderboard
+# Fill in feedback and scores for evaluations that finished in the background.
+# The workers have already recorded them to history (see evaluation_queue).
+# wait=True marks the end of an interview: block on every job and flush writes.
+def apply_evaluations(wait=False):
+    for _, index, feedback, score, digest, _, error in st.session_state.evaluations.collect(wait=wait):
+        if index < len(st.session_state.feedbacks):
+            st.session_state.feedbacks[index] = feedback
+            st.session_state.scores[index] = score
+            st.session_state.digests[index] = digest
+        if error is not None:
+            st.error(f"Failed to evaluate answer: {str(error)}. Check your HF_TOKEN setup.")
+    if wait:
+        flush_writes()
 
-def save_leaderboard(user_id, score):
-    conn = sqlite3.connect("interview.db")
-    c = conn.cursor()
-    c.execute("SELECT total_score, attempts FROM leaderboard WHERE user_id = ?", (user_id,))
-    result = c.fetchone()
-    if result:
-        total_score, attempts = result
-        c.execute(
-            "UPDATE leaderboard SET total_score = ?, attempts = ? WHERE user_id = ?",
-            (total_score + score, attempts + 1, user_id)
-        )
-    else:
-        c.execute(
-            "INSERT INTO leaderboard (user_id, total_score, attempts) VALUES (?, ?, ?)",
-            (user_id, score, 1)
-        )
-    conn.commit()
-    conn.close()
+# Snapshot the session into SQLite, or the shared store when STORAGE_URL is set (see session_store)
+SNAPSHOT_FIELDS = ("role", "domain", "mode", "question_set", "difficulty", "scores", "summary",
+                   "show_all_history", "step", "current_question_index", "exam_mode")
 
-# PDF generation
-def normalize_text(text):
-    if not text:
-        return text
-    # Preserve Unicode instead of stripping non-ASCII
-    return unicodedata.normalize('NFKD', text)
+def save_session():
+    state = {field: st.session_state[field] for field in SNAPSHOT_FIELDS}
+    return save_snapshot(st.session_state.user_id, state, {kind: st.session_state[kind] for kind in SNAPSHOT_KINDS})
 
-def generate_pdf_summary(user_id, role, mode, questions, responses, feedbacks, summary):
+# Saved at every question boundary so a crashed or closed session can be resumed
+def autosave():
+    if not st.session_state.user_id:
+        return
     try:
-        user_id = normalize_text(user_id)
-        role = normalize_text(role)
-        mode = normalize_text(mode)
-        questions = [normalize_text(q) for q in questions]
-        responses = [normalize_text(r) for r in responses]
-        feedbacks = [normalize_text(f) for f in feedbacks]
-        summary = normalize_text(summary)
+        save_session()
+    except Exception as e:
+        st.warning(f"Auto-save failed: {str(e)}")
 
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font("Arial", "B", 16)
-        pdf.cell(0, 10, "Interview Summary Report", ln=True, align="C")
-        pdf.set_font("Arial", "", 12)
-        pdf.cell(0, 10, f"User: {user_id} | Role: {role} | Mode: {mode}", ln=True, align="C")
-        pdf.cell(0, 10, f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", ln=True, align="C")
-        pdf.ln(10)
+def restore_session(state, texts):
+    session_id = st.session_state.session_id
+    for field in SNAPSHOT_FIELDS:
+        if field in state:
+            st.session_state[field] = state[field]
+    for kind in SNAPSHOT_KINDS:
+        st.session_state[kind] = TextSeq(session_id, texts[kind])
+    # Pad lists written before digests existed
+    while len(st.session_state.digests) < len(st.session_state.responses):
+        st.session_state.digests.append(None)
+    if state.get("step") == "interview" and st.session_state.current_question_index < len(st.session_state.questions):
+        # Resume mid-interview. Answers without feedback in the snapshot may have been
+        # graded and recorded by a worker since; take those from history, and put the
+        # ones that never were back in the queue.
+        flush_writes()
+        for index, (question, answer, feedback) in enumerate(zip(st.session_state.questions, st.session_state.responses, st.session_state.feedbacks)):
+            if feedback is not None or answer == "Skipped":
+                continue
+            recorded = find_answer(st.session_state.user_id, question, answer)
+            if recorded is not None:
+                st.session_state.feedbacks[index] = recorded["feedback"]
+                st.session_state.scores[index] = recorded["score"]
+                continue
+            entry = {
+                "user_id": st.session_state.user_id,
+                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "role": st.session_state.role,
+                "mode": st.session_state.mode,
+                "question_set": st.session_state.question_set,
+                "difficulty": st.session_state.difficulty,
+                "question": question,
+                "answer": answer
+            }
+            if st.session_state.exam_mode:
+                st.session_state.exam_answers.append((index, entry))
+            else:
+                st.session_state.evaluations.submit(index, question, answer, st.session_state.mode, context=entry)
+        st.session_state.step = "interview"
+        start_question_timer()
+    else:
+        st.session_state.step = "summary"
 
-        pdf.set_font("Arial", "B", 14)
-        lines = summary.split("\n")
-        for line in lines:
-            if line.strip().startswith("- "):
-                pdf.set_font("Arial", "", 12)
-                pdf.multi_cell(0, 10, f"  - {line.strip()[2:]}")
-            elif line.strip():
-                pdf.set_font("Arial", "B", 14)
-                pdf.cell(0, 10, line.strip(), ln=True)
-                pdf.ln(2)
+# Grade everything still outstanding, then hand over to the (streamed) summary
+def finish_interview():
+    if st.session_state.exam_answers:
+        pending = st.session_state.exam_answers
+        with st.spinner(f"Grading {len(pending)} answers, please wait..."):
+            results = evaluate_all(
+                [entry["question"] for _, entry in pending],
+                [entry["answer"] for _, entry in pending],
+                st.session_state.mode,
+                digest=True
+            )
+        for (index, entry), (feedback, score, digest, error) in zip(pending, results):
+            st.session_state.feedbacks[index] = feedback
+            st.session_state.scores[index] = score
+            st.session_state.digests[index] = digest
+            # Same as apply_evaluations: an upstream failure is shown, not recorded as a 0
+            if error is not None:
+                st.error(f"Failed to evaluate answer: {str(error)}. Check your HF_TOKEN setup.")
+                continue
+            record_answer(entry["user_id"], {**entry, "feedback": feedback, "score": score})
+        st.session_state.exam_answers = []
+    with st.spinner("Finishing evaluations, please wait..."):
+        apply_evaluations(wait=True)
+    st.session_state.summary = None
+    st.session_state.step = "summary"
+    autosave()
 
-        pdf_file = f"summary_{user_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        pdf.output(pdf_file)
-        return pdf_file if os.path.exists(pdf_file) else None
-    except Exception as e:
-        st.error(f"Failed to generate PDF: {str(e)}")
-        return None
+# Move past the current question (answered, skipped or timed out)
+def next_question():
+    st.session_state.current_question_index += 1
+    start_question_timer()
+    if st.session_state.current_question_index >= len(st.session_state.questions):
+        finish_interview()
+    else:
+        autosave()
 
 # Main UI
 st.title("🚀 Interview Simulator Chatbot")
@@ -199,26 +231,22 @@ with st.sidebar:
     question_set = st.selectbox("Question Set", ["Standard", "FAANG-style", "STAR-based"], help="Select question style")
     difficulty = st.selectbox("Difficulty", ["Beginner", "Medium", "Advanced"], help="Select question difficulty")
     num_questions = st.slider("Number of Questions", 1, 10, 5, help="Choose number of questions (1-10)")
+    exam_mode = st.checkbox("Exam mode", help="Collect every answer first and grade them all together at the end")
+    if get_client_error():
+        st.error(get_client_error())
+    stream_feedback = st.checkbox("Stream feedback live", help="Show each answer's feedback as it is written instead of evaluating in the background")
 
-# Timer update
-if st.session_state.step == "interview" and st.session_state.timer > 0:
-    st.session_state.timer -= 1
-    if st.session_state.timer <= 0:
-        st.warning("Time's up for this question!")
-        st.session_state.responses.append("Skipped")
-        st.session_state.feedbacks.append("Skipped due to time limit")
-        st.session_state.scores.append(0)
-        st.session_state.current_question_index += 1
-        st.session_state.timer = 300
-        if st.session_state.current_question_index >= len(st.session_state.questions):
-            with st.spinner("Generating summary, please wait..."):
-                st.session_state.summary = generate_summary(
-                    st.session_state.role, st.session_state.mode, st.session_state.questions,
-                    st.session_state.responses, st.session_state.feedbacks,
-                    st.session_state.question_set, st.session_state.difficulty
-                )
-            st.session_state.step = "summary"
-        st.rerun()
+apply_evaluations()
+
+# Timer enforcement: the deadline is checked on every interaction and by the countdown fragment
+if st.session_state.step == "interview" and timer_expired():
+    st.warning("Time's up for this question!")
+    st.session_state.responses.append("Skipped")
+    st.session_state.feedbacks.append("Skipped due to time limit")
+    st.session_state.scores.append(0)
+    st.session_state.digests.append(None)
+    next_question()
+    st.rerun()
 
 # Main content
 col1, col2 = st.columns([2, 1])
@@ -226,6 +254,8 @@ col1, col2 = st.columns([2, 1])
 with col1:
     st.header("Interview")
     if st.session_state.step == "selection":
+        # Start generating questions for the current settings while the user is still looking at them
+        prefetch_questions(role, domain, mode, question_set, difficulty, num_questions, user_id, session=st.session_state.session_id)
         with st.container():
             st.info("Select your settings and click 'Start Interview' below.")
             if st.button("Start Interview", key="start_interview", help="Begin the interview", args={"aria-label": "Start Interview"}):
@@ -241,19 +271,26 @@ with col1:
                     st.session_state.mode = mode
                     st.session_state.question_set = question_set
                     st.session_state.difficulty = difficulty
+                    st.session_state.exam_mode = exam_mode
                     with st.spinner("Generating questions, please wait..."):
                         try:
-                            st.session_state.questions = generate_questions(role, domain, mode, num_questions, question_set, difficulty)
-                            if len(st.session_state.questions) != num_questions:
-                                st.warning(f"Generated {len(st.session_state.questions)} questions instead of {num_questions}. Please try again.")
-                                st.session_state.questions = []
+                            questions, st.session_state.question_warning = take_questions(
+                                role, domain, mode, question_set, difficulty, num_questions, user_id, session=st.session_state.session_id
+                            )
+                            if len(questions) != num_questions:
+                                st.warning(f"Generated {len(questions)} questions instead of {num_questions}. Please try again.")
+                                st.session_state.questions = TextSeq(st.session_state.session_id)
                             else:
+                                session_id = st.session_state.session_id
+                                st.session_state.questions = TextSeq(session_id, questions)
                                 st.session_state.current_question_index = 0
-                                st.session_state.responses = []
-                                st.session_state.feedbacks = []
+                                st.session_state.responses = TextSeq(session_id)
+                                st.session_state.feedbacks = TextSeq(session_id)
                                 st.session_state.scores = []
+                                st.session_state.digests = TextSeq(session_id)
+                                st.session_state.exam_answers = []
                                 st.session_state.step = "interview"
-                                st.session_state.timer = 300
+                                start_question_timer()
                                 st.rerun()
                         except Exception as e:
                             st.error(f"Failed to generate questions: {str(e)}. Check your HF_TOKEN setup.")
@@ -262,12 +299,17 @@ with col1:
         question = st.session_state.questions[st.session_state.current_question_index]
         with st.container():
             st.subheader(f"Question {st.session_state.current_question_index + 1}/{len(st.session_state.questions)}")
-            st.write(f"Time remaining: {st.session_state.timer//60}:{st.session_state.timer%60:02d}")
+            if st.session_state.question_warning:
+                st.warning(st.session_state.question_warning)
+            render_countdown()
             st.write(question)
             
-            if st.session_state.current_question_index > 0 and st.session_state.feedbacks:
+            if st.session_state.current_question_index > 0 and st.session_state.feedbacks and not st.session_state.exam_mode:
                 with st.expander("Previous Feedback", expanded=False):
-                    st.write(st.session_state.feedbacks[-1])
+                    if st.session_state.feedbacks[-1] is None:
+                        st.info("Evaluation in progress...")
+                    else:
+                        st.write(st.session_state.feedbacks[-1])
             
             answer = st.text_area("Your Answer", key=f"answer_{st.session_state.current_question_index}", help="Enter your response here")
             if answer:
@@ -276,65 +318,88 @@ with col1:
             col_submit, col_retry, col_skip = st.columns(3)
             with col_submit:
                 if st.button("Submit", key=f"submit_{st.session_state.current_question_index}", help="Submit your answer", args={"aria-label": "Submit Answer"}):
-                    if answer:
-                        with st.spinner("Evaluating answer, please wait..."):
+                    if answer.strip():
+                        entry = {
+                            "user_id": user_id,
+                            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                            "role": role,
+                            "mode": mode,
+                            "question_set": question_set,
+                            "difficulty": st.session_state.difficulty,
+                            "question": question,
+                            "answer": answer
+                        }
+                        if st.session_state.exam_mode:
+                            # Graded in one parallel batch once the last question is answered
+                            st.session_state.responses.append(answer)
+                            st.session_state.feedbacks.append(None)
+                            st.session_state.scores.append(None)
+                            st.session_state.digests.append(None)
+                            st.session_state.exam_answers.append((st.session_state.current_question_index, entry))
+                        elif stream_feedback:
+                            # Show feedback token by token, then score the full text as usual
                             try:
-                                feedback, score = evaluate_answer(question, answer, st.session_state.mode)
-                                st.session_state.responses.append(answer)
-                                st.session_state.feedbacks.append(feedback)
-                                st.session_state.scores.append(score)
-
-                                history_entry = {
-                                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                                    "role": role,
-                                    "mode": mode,
-                                    "question_set": question_set,
-                                    "question": question,
-                                    "answer": answer,
-                                    "feedback": feedback,
-                                    "score": score
-                                }
-                                save_history(user_id, history_entry)
-                                save_leaderboard(user_id, score)
-
-                                st.session_state.current_question_index += 1
-                                st.session_state.timer = 300
-                                if st.session_state.current_question_index >= len(st.session_state.questions):
-                                    with st.spinner("Generating summary, please wait..."):
-                                        st.session_state.summary = generate_summary(
-                                            role, mode, st.session_state.questions, st.session_state.responses,
-                                            st.session_state.feedbacks, question_set, difficulty
-                                        )
-                                    st.session_state.step = "summary"
-                                st.rerun()
+                                feedback = st.write_stream(evaluate_answer_stream(question, answer, st.session_state.mode))
                             except Exception as e:
                                 st.error(f"Failed to evaluate answer: {str(e)}. Check your HF_TOKEN setup.")
+                                st.stop()
+                            score = parse_score(feedback)
+                            st.session_state.responses.append(answer)
+                            st.session_state.feedbacks.append(feedback)
+                            st.session_state.scores.append(score)
+                            st.session_state.digests.append(None)
+                            record_answer(user_id, {**entry, "feedback": feedback, "score": score})
+                            # Only the digest is left to do, in the background
+                            st.session_state.evaluations.submit(
+                                st.session_state.current_question_index, question, answer, st.session_state.mode,
+                                feedback=feedback, score=score
+                            )
+                        else:
+                            # Queue the evaluation and move on; feedback and score fill in as it completes
+                            st.session_state.responses.append(answer)
+                            st.session_state.feedbacks.append(None)
+                            st.session_state.scores.append(None)
+                            st.session_state.digests.append(None)
+                            st.session_state.evaluations.submit(
+                                st.session_state.current_question_index, question, answer, st.session_state.mode,
+                                context=entry
+                            )
+
+                        next_question()
+                        st.rerun()
                     else:
                         st.warning("Please provide an answer.")
             with col_retry:
                 if st.button("Retry", key=f"retry_{st.session_state.current_question_index}", help="Retry this question", args={"aria-label": "Retry Question"}):
-                    st.session_state.timer = 300
+                    start_question_timer()
                     st.rerun()
             with col_skip:
                 if st.button("Skip", key=f"skip_{st.session_state.current_question_index}", help="Skip this question", args={"aria-label": "Skip Question"}):
                     st.session_state.responses.append("Skipped")
                     st.session_state.feedbacks.append("Skipped by user")
                     st.session_state.scores.append(0)
-                    st.session_state.current_question_index += 1
-                    st.session_state.timer = 300
-                    if st.session_state.current_question_index >= len(st.session_state.questions):
-                        with st.spinner("Generating summary, please wait..."):
-                            st.session_state.summary = generate_summary(
-                                role, mode, st.session_state.questions, st.session_state.responses,
-                                st.session_state.feedbacks, question_set, difficulty
-                            )
-                        st.session_state.step = "summary"
+                    st.session_state.digests.append(None)
+                    next_question()
                     st.rerun()
 
     elif st.session_state.step == "summary":
         st.header("Interview Summary")
         with st.container():
-            st.write(st.session_state.summary)
+            if st.session_state.summary is None:
+                # Render the summary as it streams in; the joined text feeds the exports below
+                try:
+                    st.session_state.summary = st.write_stream(generate_summary_stream(
+                        st.session_state.role, st.session_state.mode, st.session_state.questions,
+                        st.session_state.responses, st.session_state.feedbacks,
+                        st.session_state.question_set, st.session_state.difficulty,
+                        digests=st.session_state.digests
+                    ))
+                except Exception as e:
+                    st.error(f"Failed to generate summary: {str(e)}. Check your HF_TOKEN setup.")
+                    st.session_state.summary = "Error: Failed to generate summary"
+                autosave()
+            else:
+                st.write(st.session_state.summary)
             
             if st.session_state.scores:
                 st.subheader("Your Performance")
@@ -376,63 +441,121 @@ with col1:
                     st.error(f"Failed to render chart: {str(e)}. Showing scores as text instead.")
                     st.write("Scores:", st.session_state.scores)
 
+            # Daily averages from the rollup tables: this user vs everyone, same role and mode
+            since = (datetime.now() - timedelta(days=TREND_DAYS)).strftime("%Y-%m-%d")
+            trend = load_score_trend(st.session_state.user_id, since=since, role=st.session_state.role, mode=st.session_state.mode)
+            if trend:
+                cohort = {point["day"]: point["average"] for point in load_cohort_trend(since=since, role=st.session_state.role, mode=st.session_state.mode)}
+                st.subheader("Your Progress")
+                st.line_chart({
+                    "day": [point["day"] for point in trend],
+                    "You": [point["average"] for point in trend],
+                    "Cohort": [cohort.get(point["day"]) for point in trend]
+                }, x="day", y=["You", "Cohort"])
+
+            # Exports render in the background as soon as the summary exists; the
+            # buttons below only wait for (usually finished) in-memory results
+            txt_export = export.export_txt(st.session_state.session_id, st.session_state.summary)
+            pdf_export = None
+            if st.session_state.responses:
+                pdf_export = export.export_pdf(
+                    st.session_state.session_id, st.session_state.user_id, st.session_state.role,
+                    st.session_state.mode, st.session_state.summary
+                )
+
             col_txt, col_pdf, col_new = st.columns(3)
             with col_txt:
                 if st.button("Export as TXT", help="Download summary as text", args={"aria-label": "Export as TXT"}):
-                    with open("interview_summary.txt", "w", encoding="utf-8") as f:
-                        f.write(st.session_state.summary)
-                    with open("interview_summary.txt", "r", encoding="utf-8") as f:
-                        st.download_button("Download TXT", f, file_name="interview_summary.txt")
+                    st.download_button("Download TXT", txt_export.result(), file_name="interview_summary.txt", mime="text/plain")
                     st.success("TXT file generated successfully!")
             with col_pdf:
                 if st.button("Export as PDF", disabled=not st.session_state.responses, help="Download summary as PDF", args={"aria-label": "Export as PDF"}):
                     with st.spinner("Generating PDF, please wait..."):
-                        pdf_file = generate_pdf_summary(
-                            st.session_state.user_id,
-                            st.session_state.role,
-                            st.session_state.mode,
-                            st.session_state.questions,
-                            st.session_state.responses,
-                            st.session_state.feedbacks,
-                            st.session_state.summary
-                        )
-                        if pdf_file and os.path.exists(pdf_file):
-                            with open(pdf_file, "rb") as f:
-                                st.download_button("Download PDF", f, file_name=pdf_file, mime="application/pdf")
-                            st.success("PDF generated successfully!")
-                        else:
-                            st.error("Failed to generate PDF. Please try again.")
+                        try:
+                            pdf_bytes = pdf_export.result()
+                        except Exception as e:
+                            st.error(f"Failed to generate PDF: {str(e)}")
+                            pdf_bytes = None
+                    if pdf_bytes:
+                        st.download_button("Download PDF", pdf_bytes, file_name=export.file_name(st.session_state.user_id, "pdf"), mime="application/pdf")
+                        st.success("PDF generated successfully!")
+                    else:
+                        st.error("Failed to generate PDF. Please try again.")
             with col_new:
                 if st.button("New Interview", help="Start a new interview", args={"aria-label": "New Interview"}):
+                    discard_session(st.session_state.session_id)
                     for key in list(st.session_state.keys()):
                         del st.session_state[key]
                     st.rerun()
 
+# Ranked full-text search over history; `scope` keys the widgets and the page offset.
+# user_id=None searches every user (admin panel only).
+def history_search(scope, user_id=None):
+    query = st.text_input("Search history", key=f"{scope}_search_query", placeholder="e.g. kafka partition*")
+    owner, max_score = user_id, None
+    if user_id is None:
+        owner = st.text_input("User ID (optional)", key=f"{scope}_search_user").strip() or None
+        max_score = st.slider("Max score", 0, 10, 10, key=f"{scope}_search_max_score")
+        max_score = None if max_score == 10 else max_score
+    if not query.strip():
+        return
+    # Back to the first page whenever the search changes
+    search = (query, owner, max_score)
+    if st.session_state.get(f"{scope}_search_page", (None, 0))[0] != search:
+        st.session_state[f"{scope}_search_page"] = (search, 0)
+    offset = st.session_state[f"{scope}_search_page"][1]
+    results, next_offset = search_history(query, user_id=owner, max_score=max_score, offset=offset)
+    if not results:
+        st.write("No matches.")
+    for entry in results:
+        who = "" if user_id else f"{entry['user_id']} · "
+        st.markdown(f"**{entry['score']}/10** · {who}{entry['timestamp']} · {entry['role']}  \n{entry['snippet']}")
+    prev_col, next_col = st.columns(2)
+    if offset and prev_col.button("Previous", key=f"{scope}_search_prev"):
+        st.session_state[f"{scope}_search_page"] = (search, max(0, offset - SEARCH_PAGE_SIZE))
+        st.rerun()
+    if next_offset is not None and next_col.button("Next", key=f"{scope}_search_next"):
+        st.session_state[f"{scope}_search_page"] = (search, next_offset)
+        st.rerun()
+
 with col2:
     st.header("Feedback History")
     if st.session_state.user_id:
-        history = load_history(st.session_state.user_id)
-        display_limit = len(history) if st.session_state.show_all_history else min(5, len(history))
-        for i, entry in enumerate(history[:display_limit]):
+        with st.expander("Search your history", expanded=False):
+            history_search("own", st.session_state.user_id)
+        pages = st.session_state.history_pages
+        expanded = st.session_state.show_all_history and pages is not None and pages[0] == st.session_state.user_id
+        if expanded:
+            # Fresh rows down to where the first page ended, then the older pages already fetched
+            _, boundary, older, cursor = pages
+            history = load_history_since(st.session_state.user_id, boundary) + older
+        else:
+            history, cursor = load_history_page(st.session_state.user_id)
+        for i, entry in enumerate(history):
             with st.expander(f"{entry['timestamp']} - {entry['role']} ({entry['mode']})", expanded=False):
                 st.write(f"**Question**: {entry['question']}")
                 st.write(f"**Answer**: {entry['answer']}")
                 st.write(f"**Feedback**: {entry['feedback']}")
                 st.write(f"**Score**: {entry['score']}/10")
-        if len(history) > 5 and not st.session_state.show_all_history:
+        if cursor is not None:
             if st.button("Show More History", key="show_more_history", help="View more history", args={"aria-label": "Show More History"}):
+                page, next_cursor = load_history_page(st.session_state.user_id, before=cursor)
+                if expanded:
+                    st.session_state.history_pages = (pages[0], pages[1], older + page, next_cursor)
+                else:
+                    st.session_state.history_pages = (st.session_state.user_id, cursor, page, next_cursor)
                 st.session_state.show_all_history = True
                 st.rerun()
-        elif st.session_state.show_all_history and len(history) > 5:
+        if expanded:
             if st.button("Show Less History", key="show_less_history", help="View less history", args={"aria-label": "Show Less History"}):
                 st.session_state.show_all_history = False
+                st.session_state.history_pages = None
                 st.rerun()
 
     st.header("Leaderboard")
-    leaderboard = load_leaderboard()
+    leaderboard = load_top_leaderboard(5)
     if leaderboard:
-        leaderboard = sorted(leaderboard, key=lambda x: x["total_score"] / x["attempts"], reverse=True)
-        for i, entry in enumerate(leaderboard[:5], 1):
+        for i, entry in enumerate(leaderboard, 1):
             avg_score = entry["total_score"] / entry["attempts"]
             st.write(f"{i}. {entry['user_id']} - Avg Score: {avg_score:.2f} ({entry['attempts']} attempts)")
 
@@ -440,43 +563,51 @@ with col2:
 with st.sidebar:
     st.header("Session Management")
     if st.button("Save Session", help="Save current session", args={"aria-label": "Save Session"}):
-        session_data = {
-            "user_id": st.session_state.user_id,
-            "role": st.session_state.role,
-            "domain": st.session_state.domain,
-            "mode": st.session_state.mode,
-            "question_set": st.session_state.question_set,
-            "difficulty": st.session_state.difficulty,
-            "questions": st.session_state.questions,
-            "responses": st.session_state.responses,
-            "feedbacks": st.session_state.feedbacks,
-            "summary": st.session_state.summary,
-            "scores": st.session_state.scores,
-            "show_all_history": st.session_state.show_all_history
-        }
-        session_file = f"session_{st.session_state.user_id}.json"
-        with open(session_file, "w", encoding="utf-8") as f:
-            json.dump(session_data, f)
-        st.success("Session saved successfully!")
+        if not st.session_state.user_id:
+            st.warning("Please enter a User ID.")
+        else:
+            try:
+                version, written = save_session()
+            except storage.UNAVAILABLE:
+                storage.ERRORS.inc(operation="snapshot_save")
+                st.error("Session storage is unavailable right now. Please try again later.")
+            else:
+                st.success(f"Session saved successfully! (version {version}, {written} items written)")
 
     if st.button("Load Session", help="Load previous session", args={"aria-label": "Load Session"}):
-        session_file = f"session_{st.session_state.user_id}.json"
-        if os.path.exists(session_file):
-            with open(session_file, "r", encoding="utf-8") as f:
-                session_data = json.load(f)
-            st.session_state.user_id = session_data["user_id"]
-            st.session_state.role = session_data["role"]
-            st.session_state.domain = session_data["domain"]
-            st.session_state.mode = session_data["mode"]
-            st.session_state.question_set = session_data["question_set"]
-            st.session_state.difficulty = session_data.get("difficulty", "Medium")
-            st.session_state.questions = session_data["questions"]
-            st.session_state.responses = session_data["responses"]
-            st.session_state.feedbacks = session_data["feedbacks"]
-            st.session_state.summary = session_data["summary"]
-            st.session_state.scores = session_data["scores"]
-            st.session_state.show_all_history = session_data.get("show_all_history", False)
-            st.session_state.step = "summary"
-            st.rerun()
+        # Persist anything still being evaluated before the lists are replaced
+        apply_evaluations(wait=True)
+        st.session_state.evaluations = EvaluationQueue()
+        st.session_state.exam_answers = []
+        try:
+            snapshot = load_snapshot(st.session_state.user_id) if st.session_state.user_id else None
+        except storage.UNAVAILABLE:
+            storage.ERRORS.inc(operation="snapshot_load")
+            st.error("Session storage is unavailable right now. Please try again later.")
         else:
-            st.warning("No saved session found.")
\ No newline at end of file
+            if snapshot is not None:
+                restore_session(*snapshot)
+                st.rerun()
+            else:
+                st.warning("No saved session found.")
+
+# Admin panel: live metrics for finding scaling limits
+if ADMIN_TOKEN and st.query_params.get("admin") == "1" and hmac.compare_digest(st.query_params.get("token", "").encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+    with st.sidebar:
+        st.header("Admin")
+        st.write("Inference gateway", inference.stats())
+        if inference.cache is not None:
+            st.write("LLM cache", inference.cache.stats())
+        st.write("Storage", type(storage.get_store()).__name__ + (" (shared)" if storage.shared() else " (this process)"))
+        if storage.ERRORS.by_label("operation"):
+            st.write("Storage errors (skipped, served without the store)", storage.ERRORS.by_label("operation"))
+        for name in ("get_questions", "generate_questions", "evaluate_answer", "generate_summary", "load_history_page", "load_top_leaderboard", "search_history", "render_pdf"):
+            count, total = metrics.FUNCTION_SECONDS.summary(function=name)
+            if count:
+                st.write(f"{name}: {count} calls, {total / count * 1000:.1f} ms avg")
+        with st.expander("Search all history", expanded=False):
+            history_search("admin")
+        with st.expander("Prometheus metrics", expanded=False):
+            st.code(metrics.render(), language="text")
+
+metrics.RERUN_SECONDS.observe(time.perf_counter() - rerun_started)
@@ -0,0 +1,134 @@
+import os
+import re
+import json
+import hashlib
+import urllib.error
+import urllib.request
+from types import SimpleNamespace
+
+# Inference providers. Each client exposes chat_completion(messages, model,
+# max_tokens, temperature, stream) with the same response shapes as
+# huggingface_hub.InferenceClient, so the gateway in inference.py works with any.
+#
+#   hf    - Hugging Face Inference API (needs HF_TOKEN)
+#   local - any OpenAI-compatible server on this machine, e.g. llama.cpp's
+#           llama-server (run it with --parallel N to batch concurrent requests)
+#   fake  - deterministic canned answers, no network; for tests and demos
+# Settings (LLM_PROVIDER, LOCAL_LLM_URL, LLM_MODEL*) are read when used, not at
+# import, so a .env loaded afterwards still applies.
+DEFAULT_MODELS = {
+    "hf": "mistralai/Mistral-7B-Instruct-v0.3",
+    "local": "local",
+    "fake": "fake",
+}
+
+
+def provider_name():
+    return os.getenv("LLM_PROVIDER", "hf")
+
+
+def model_for(task, provider=None):
+    # Tasks: questions, evaluate, digest, summary. LLM_MODEL_<TASK> (e.g. a small
+    # model for LLM_MODEL_EVALUATE), else LLM_MODEL, else the provider default
+    provider = provider or provider_name()
+    return os.getenv(f"LLM_MODEL_{task.upper()}") or os.getenv("LLM_MODEL") or DEFAULT_MODELS.get(provider, "")
+
+
+def _completion(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def _chunk(token):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+
+
+class LocalHTTPError(Exception):
+    # Shaped like huggingface_hub's HTTP errors so inference._classify can read the status
+    def __init__(self, status_code, message, headers=None):
+        super().__init__(f"{status_code} {message}")
+        self.response = SimpleNamespace(status_code=status_code, headers=dict(headers or {}))
+
+
+class LocalClient:
+    # Minimal OpenAI-compatible /chat/completions client on the standard library
+    def __init__(self, base_url=None, timeout=None):
+        self.base_url = (base_url or os.getenv("LOCAL_LLM_URL", "http://127.0.0.1:8080/v1")).rstrip("/")
+        self.timeout = timeout or float(os.getenv("LOCAL_LLM_TIMEOUT", "120"))
+
+    def chat_completion(self, messages, model=None, max_tokens=512, temperature=1, stream=False, **kwargs):
+        payload = {"messages": messages, "model": model, "max_tokens": max_tokens, "temperature": temperature, "stream": stream}
+        request = urllib.request.Request(
+            f"{self.base_url}/chat/completions",
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"}
+        )
+        try:
+            response = urllib.request.urlopen(request, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            raise LocalHTTPError(e.code, e.reason, e.headers) from e
+        except urllib.error.URLError as e:
+            raise ConnectionError(f"Local model server unreachable at {self.base_url}: {e.reason}") from e
+        if stream:
+            return self._events(response)
+        with response:
+            body = json.loads(response.read().decode("utf-8"))
+        return _completion(body["choices"][0]["message"]["content"] or "")
+
+    def _events(self, response):
+        # Server-sent events: "data: {...}" lines, terminated by "data: [DONE]"
+        with response:
+            for line in response:
+                line = line.decode("utf-8").strip()
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    return
+                choices = json.loads(data).get("choices") or []
+                token = choices[0].get("delta", {}).get("content") if choices else None
+                if token:
+                    yield _chunk(token)
+
+
+class FakeClient:
+    # Deterministic: the same prompt always gets the same answer, and scores vary with the prompt
+    def chat_completion(self, messages, model=None, max_tokens=512, temperature=1, stream=False, **kwargs):
+        content = self._content(messages[-1]["content"])
+        if stream:
+            return iter([_chunk(token) for token in re.findall(r"\s*\S+", content)])
+        return _completion(content)
+
+    def _content(self, prompt):
+        seed = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest(), 16)
+        if prompt.startswith("Generate exactly"):
+            count = int(prompt.split()[2])
+            return json.dumps({"questions": [f"Practice question {i + 1} ({seed % 1000:03d}): walk through a problem you solved." for i in range(count)]})
+        if "Condense this" in prompt:
+            return "Clear structure; could add a concrete example."
+        if prompt.startswith("Evaluate") and "JSON" in prompt:
+            return json.dumps({"feedback": "Reasonable answer with room for more depth.", "score": 4 + seed % 6, "suggestions": "Add a concrete example."})
+        if prompt.startswith("Evaluate"):
+            return f"Reasonable answer with room for more depth.\nScore: {4 + seed % 6}/10\nSuggestions: add a concrete example."
+        if "Score this" in prompt:
+            return json.dumps({"score": 4 + seed % 6})
+        return "Areas of Strength\n- Clear communication\nAreas to Improve\n- More concrete examples\nOverall Score\n- See per-question scores"
+
+
+def create_client(get_token=None, provider=None):
+    # Returns (client, error message); the client is None when the provider can't be set up
+    provider = provider or provider_name()
+    if provider == "fake":
+        return FakeClient(), None
+    if provider == "local":
+        return LocalClient(), None
+    if provider != "hf":
+        return None, f"Unknown LLM_PROVIDER '{provider}'. Use one of: hf, local, fake."
+    token = get_token() if get_token else os.getenv("HF_TOKEN")
+    if not token:
+        return None, "HF_TOKEN is missing. Please set it in Streamlit secrets (cloud) or .env file (local). Get a free token from https://huggingface.co/settings/tokens"
+    try:
+        # Deferred: huggingface_hub is the heaviest import in the app
+        from huggingface_hub import InferenceClient
+        return InferenceClient(token=token), None
+    except Exception as e:
+        return None, f"Invalid HF_TOKEN: {str(e)}. Regenerate a new token at https://huggingface.co/settings/tokens and ensure you've accepted the model terms at https://huggingface.co/mistralai/Mistral-7B-Instruct-v0.3"
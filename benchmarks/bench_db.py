@@ -0,0 +1,138 @@
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import tempfile
+import threading
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+
+ENTRY = {
+    "timestamp": "2024-01-01 12:00:00",
+    "role": "Software Engineer",
+    "mode": "Technical Interview",
+    "question_set": "Standard",
+    "difficulty": "Medium",
+    "question": "1. Explain the difference between a process and a thread.",
+    "answer": "A process has its own address space; threads share one. " * 5,
+    "feedback": "Good answer. Score: 7/10",
+    "score": 7
+}
+
+
+# The connect-per-call implementation this module replaced, kept for comparison
+class Legacy:
+    path = None
+
+    @classmethod
+    def save_history(cls, user_id, entry):
+        conn = sqlite3.connect(cls.path)
+        c = conn.cursor()
+        c.execute(
+            "INSERT INTO history (user_id, timestamp, role, mode, question_set, question, answer, feedback, score) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (user_id, entry["timestamp"], entry["role"], entry["mode"], entry["question_set"],
+             entry["question"], entry["answer"], entry["feedback"], entry["score"])
+        )
+        conn.commit()
+        conn.close()
+
+    @classmethod
+    def load_history(cls, user_id):
+        conn = sqlite3.connect(cls.path)
+        c = conn.cursor()
+        c.execute("SELECT * FROM history WHERE user_id = ? ORDER BY timestamp DESC", (user_id,))
+        rows = c.fetchall()
+        conn.close()
+        return rows
+
+    @classmethod
+    def save_leaderboard(cls, user_id, score):
+        conn = sqlite3.connect(cls.path)
+        c = conn.cursor()
+        c.execute("SELECT total_score, attempts FROM leaderboard WHERE user_id = ?", (user_id,))
+        result = c.fetchone()
+        if result:
+            c.execute("UPDATE leaderboard SET total_score = ?, attempts = ? WHERE user_id = ?",
+                      (result[0] + score, result[1] + 1, user_id))
+        else:
+            c.execute("INSERT INTO leaderboard (user_id, total_score, attempts) VALUES (?, ?, ?)", (user_id, score, 1))
+        conn.commit()
+        conn.close()
+
+    @classmethod
+    def load_leaderboard(cls):
+        conn = sqlite3.connect(cls.path)
+        c = conn.cursor()
+        c.execute("SELECT user_id, total_score, attempts FROM leaderboard")
+        rows = c.fetchall()
+        conn.close()
+        return rows
+
+
+def run(impl, ops, threads):
+    # Failed operations are counted, not retried; rates only count the ones that completed
+    errors = Counter()  # (operation, error type) -> count
+    results = {}
+
+    def worker(n, name, fn, done):
+        for i in range(n):
+            try:
+                fn(i)
+            except sqlite3.Error as e:
+                errors[(name, type(e).__name__)] += 1
+            else:
+                done.append(1)
+
+    cases = {
+        "save_history": lambda i: impl.save_history(f"user{i % 50}", ENTRY),
+        "load_history": lambda i: impl.load_history(f"user{i % 50}"),
+        "save_leaderboard": lambda i: impl.save_leaderboard(f"user{i % 50}", i % 10),
+        "load_leaderboard": lambda i: impl.load_leaderboard(),
+    }
+    for name, fn in cases.items():
+        done = []
+        workers = [threading.Thread(target=worker, args=(ops // threads, name, fn, done)) for _ in range(threads)]
+        start = time.perf_counter()
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        results[name] = len(done) / (time.perf_counter() - start)
+    return results, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite ops/sec: connect-per-call vs pooled db module")
+    parser.add_argument("--ops", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        Legacy.path = os.path.join(tmp, "legacy.db")
+        # Same schema, default journal mode, as the original init_db produced
+        db.configure(Legacy.path)
+        db.init_db()
+        db.close_all()
+        with sqlite3.connect(Legacy.path) as conn:
+            conn.execute("PRAGMA journal_mode=DELETE")
+        legacy, legacy_errors = run(Legacy, args.ops, args.threads)
+
+        db.configure(os.path.join(tmp, "pooled.db"))
+        db.init_db()
+        pooled, pooled_errors = run(db, args.ops, args.threads)
+        db.close_all()
+
+    print(f"{'operation':<18}{'legacy ops/s':>14}{'pooled ops/s':>14}{'speedup':>9}")
+    for name in legacy:
+        print(f"{name:<18}{legacy[name]:>14.0f}{pooled[name]:>14.0f}{pooled[name] / legacy[name]:>8.1f}x")
+    print(f"failed operations: legacy {sum(legacy_errors.values())}, pooled {sum(pooled_errors.values())}")
+    for name, error in sorted(set(legacy_errors) | set(pooled_errors)):
+        print(f"  {name} {error}: legacy {legacy_errors[(name, error)]}, pooled {pooled_errors[(name, error)]}")
+
+
+if __name__ == "__main__":
+    main()
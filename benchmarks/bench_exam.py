@@ -0,0 +1,51 @@
+import time
+import argparse
+
+from stub_client import StubInferenceClient, install
+
+import inference
+from evaluation_queue import evaluate_all
+
+
+def fresh_bucket(rate, burst):
+    # Each run starts from a full bucket, as an exam submitted to an idle process would
+    inference.bucket = inference.TokenBucket(rate, burst)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exam grading wall-clock (grade + digest per answer): serial vs bounded parallel pool")
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=1.0, help="stub LLM latency in seconds")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=inference.RATE, help="token bucket rate (INFERENCE_RATE)")
+    parser.add_argument("--burst", type=int, default=inference.BURST, help="token bucket size (INFERENCE_BURST)")
+    args = parser.parse_args()
+
+    stub = install(StubInferenceClient(latency=args.latency))
+    inference.cache = None  # every call must reach the (slow) stub
+    questions = [f"{i + 1}. Question {i + 1}?" for i in range(args.questions)]
+    answers = [f"Answer number {i + 1}" for i in range(args.questions)]
+    mode = "Technical Interview"
+
+    # The path app.py takes: evaluate_all(..., digest=True), two calls per answer
+    fresh_bucket(args.rate, args.burst)
+    start = time.perf_counter()
+    serial = [evaluate_all([q], [a], mode, max_workers=1, digest=True)[0] for q, a in zip(questions, answers)]
+    serial_time = time.perf_counter() - start
+
+    fresh_bucket(args.rate, args.burst)
+    calls_before = stub.calls
+    start = time.perf_counter()
+    parallel = evaluate_all(questions, answers, mode, max_workers=args.concurrency, digest=True)
+    parallel_time = time.perf_counter() - start
+    calls = stub.calls - calls_before
+
+    assert [s for _, s, _, _ in serial] == [s for _, s, _, _ in parallel]
+    print(f"{args.questions} answers, {calls} LLM calls, bucket rate {args.rate:g}/s burst {args.burst}")
+    print(f"serial:   {serial_time:6.2f} s ({serial_time / args.latency:.1f} LLM round trips)")
+    print(f"parallel: {parallel_time:6.2f} s ({parallel_time / args.latency:.1f} LLM round trips, concurrency {args.concurrency}; "
+          f"grade then digest makes 2 the floor)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import os
+import time
+import argparse
+import statistics
+import tempfile
+
+from stub_client import StubInferenceClient, install
+
+import inference
+import db
+import prefetch
+
+SETTINGS = ("Software Engineer", "backend", "Technical Interview", "Standard", "Medium", 5)
+
+
+def time_to_first_question(use_prefetch, think_time):
+    prefetch.clear()
+    # Empty question bank, so every interview start pays for the LLM call
+    with db.transaction() as conn:
+        conn.execute("DELETE FROM question_bank")
+    if use_prefetch:
+        # Sidebar settings settle, the user reads the page, then clicks Start
+        prefetch.prefetch_questions(*SETTINGS)
+    time.sleep(think_time)
+    start = time.perf_counter()
+    questions, _ = prefetch.take_questions(*SETTINGS)
+    elapsed = time.perf_counter() - start
+    assert len(questions) == SETTINGS[-1]
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time-to-first-question with and without prefetch")
+    parser.add_argument("--latency", type=float, default=1.5, help="stub LLM latency in seconds")
+    parser.add_argument("--think-time", type=float, default=2.0, help="seconds between settings settling and Start")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    install(StubInferenceClient(latency=args.latency))
+    inference.cache = None
+    with tempfile.TemporaryDirectory() as tmp:
+        db.configure(os.path.join(tmp, "bench.db"))
+        db.ensure_schema()
+        for label, use_prefetch in (("no prefetch", False), ("prefetch", True)):
+            samples = [time_to_first_question(use_prefetch, args.think_time) for _ in range(args.runs)]
+            print(f"{label:>12}: median {statistics.median(samples) * 1000:8.1f} ms  max {max(samples) * 1000:8.1f} ms")
+        db.close_all()
+
+
+if __name__ == "__main__":
+    main()
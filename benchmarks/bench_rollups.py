@@ -0,0 +1,73 @@
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from bench_db import ENTRY
+
+
+def python_trend(user_id, since):
+    # What the dashboard would do without rollups: pull the rows, aggregate in Python
+    days = defaultdict(lambda: [0, 0])
+    for entry in db.load_history(user_id):
+        day = entry["timestamp"][:10]
+        if day >= since:
+            days[day][0] += 1
+            days[day][1] += entry["score"]
+    return [{"day": day, "attempts": a, "average": t / a} for day, (a, t) in sorted(days.items())]
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score trend queries: Python over history rows vs rollup tables")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--days", type=int, default=180)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    start_day = datetime(2024, 1, 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        db.configure(os.path.join(tmp, "rollups.db"))
+        db.init_db()
+        rows = []
+        for i in range(args.rows):
+            ts = start_day + timedelta(days=rng.randrange(args.days), seconds=rng.randrange(86400))
+            entry = {**ENTRY, "timestamp": ts.strftime("%Y-%m-%d %H:%M:%S"), "score": rng.randrange(11),
+                     "difficulty": rng.choice(("Beginner", "Medium", "Advanced"))}
+            rows.append(db.history_row(f"user{i % args.users}", entry))
+        load_start = time.perf_counter()
+        with db.transaction() as conn:
+            conn.executemany(db.SQL_SAVE_HISTORY, rows)
+        load_time = time.perf_counter() - load_start
+
+        since = (start_day + timedelta(days=args.days - 90)).strftime("%Y-%m-%d")
+        python_ms, expected = timed(lambda: python_trend("user7", since), args.repeat)
+        rollup_ms, actual = timed(lambda: db.load_score_trend("user7", since=since), args.repeat)
+        cohort_ms, cohort = timed(lambda: db.load_cohort_trend(since=since, role=ENTRY["role"]), args.repeat)
+        assert [(p["day"], p["attempts"]) for p in expected] == [(p["day"], p["attempts"]) for p in actual]
+        db.close_all()
+
+    print(f"{args.rows} history rows, {args.users} users, {args.days} days "
+          f"(inserted with rollup triggers in {load_time:.2f} s)")
+    print(f"user 90-day trend, Python over rows: {python_ms:8.2f} ms")
+    print(f"user 90-day trend, rollup query:     {rollup_ms:8.2f} ms ({len(actual)} points)")
+    print(f"cohort 90-day trend, rollup query:   {cohort_ms:8.2f} ms ({len(cohort)} points)")
+
+
+if __name__ == "__main__":
+    main()
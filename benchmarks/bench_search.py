@@ -0,0 +1,88 @@
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from bench_db import ENTRY
+
+TOPICS = ["Kafka", "Redis", "PostgreSQL", "Kubernetes", "GraphQL", "gRPC", "Terraform", "Elasticsearch",
+          "RabbitMQ", "Cassandra", "Spark", "Airflow", "React", "Django", "Flask", "Rust", "Go", "Java"]
+WORDS = ("design scale latency throughput consistency partition replica cache queue index shard failover "
+         "retry timeout backpressure monitoring deployment rollback schema migration transaction lock "
+         "contention ordering idempotent batch stream window checkpoint leader election quorum").split()
+
+LIKE_SQL = (
+    "SELECT rowid, user_id, score FROM history "
+    "WHERE (question LIKE ?1 OR answer LIKE ?1 OR feedback LIKE ?1) AND score <= ?2 "
+    "ORDER BY timestamp DESC LIMIT ?3"
+)
+
+
+def text(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="History search: LIKE scan vs the FTS5 index")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        db.configure(os.path.join(tmp, "search.db"))
+        db.init_db()
+        load_start = time.perf_counter()
+        batch = []
+        for i in range(args.rows):
+            topic = rng.choice(TOPICS)
+            entry = {**ENTRY, "timestamp": f"2024-{1 + i % 12:02d}-{1 + i % 28:02d} 12:00:00",
+                     "question": f"{1 + i % 5}. How would you use {topic} to {text(rng, 6)}?",
+                     "answer": f"With {rng.choice(TOPICS)} I would {text(rng, 40)}.",
+                     "feedback": f"{text(rng, 30)}. Score: {i % 11}/10", "score": i % 11}
+            batch.append(db.history_row(f"user{i % args.users}", entry))
+            if len(batch) == 10000:
+                with db.transaction() as conn:
+                    conn.executemany(db.SQL_SAVE_HISTORY, batch)
+                batch = []
+        if batch:
+            with db.transaction() as conn:
+                conn.executemany(db.SQL_SAVE_HISTORY, batch)
+        load_time = time.perf_counter() - load_start
+        size = os.path.getsize(os.path.join(tmp, "search.db"))
+
+        def like():
+            with db.connection() as conn:
+                return conn.execute(LIKE_SQL, ("%kafka%", 4, db.SEARCH_PAGE_SIZE)).fetchall()
+
+        like_ms, like_rows = timed(like, args.repeat)
+        fts_ms, (results, _) = timed(lambda: db.search_history("kafka", max_score=4), args.repeat)
+        narrow_ms, (narrow, _) = timed(lambda: db.search_history("kafka partition failover", columns=["answer"], max_score=4), args.repeat)
+        user_ms, (mine, _) = timed(lambda: db.search_history("kafka", user_id="user7"), args.repeat)
+        page_ms, _ = timed(lambda: db.search_history("kafka", max_score=4, offset=10 * db.SEARCH_PAGE_SIZE), args.repeat)
+        db.close_all()
+
+    print(f"{args.rows} history rows, {args.users} users, loaded with FTS triggers in {load_time:.1f} s "
+          f"({size / 1e6:.0f} MB database)")
+    print(f"LIKE '%kafka%', score <= 4:           {like_ms:9.1f} ms ({len(like_rows)} rows, unranked)")
+    print(f"FTS 'kafka', score <= 4, ranked:       {fts_ms:9.1f} ms ({len(results)} results)")
+    print(f"FTS 3 terms in answers, score <= 4:    {narrow_ms:9.1f} ms ({len(narrow)} results)")
+    print(f"FTS 'kafka' for one user:              {user_ms:9.1f} ms ({len(mine)} results)")
+    print(f"FTS 'kafka', score <= 4, page 11:      {page_ms:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
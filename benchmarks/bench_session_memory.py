@@ -0,0 +1,81 @@
+import os
+import sys
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+import session_store
+from session_store import TextSeq
+
+FEEDBACK = "The answer covers the main trade-offs but misses failure handling. " * 30  # ~2 KB, like real LLM feedback
+ANSWER = "I would start by clarifying the requirements and the expected load. " * 20
+
+
+def session_texts(n, questions):
+    qs = [f"{i + 1}. Question {i + 1} for session {n}: how would you design this system?" for i in range(questions)]
+    answers = [f"{ANSWER} ({n}/{i})" for i in range(questions)]
+    feedbacks = [f"{FEEDBACK} ({n}/{i})" for i in range(questions)]
+    digests = [f"Score: 7/10. Session {n} question {i}: clear, missing failure handling." for i in range(questions)]
+    return qs, answers, feedbacks, digests
+
+
+def measure(build):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    sessions = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return sessions, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory held by N sessions: plain lists vs TextSeq (texts in SQLite)")
+    parser.add_argument("--sessions", type=int, default=500)
+    parser.add_argument("--questions", type=int, default=10)
+    args = parser.parse_args()
+
+    def plain():
+        sessions = []
+        for n in range(args.sessions):
+            qs, answers, feedbacks, digests = session_texts(n, args.questions)
+            sessions.append({"questions": qs, "responses": answers, "feedbacks": feedbacks,
+                             "digests": digests, "scores": [7] * args.questions})
+        return sessions
+
+    def compact():
+        sessions = []
+        for n in range(args.sessions):
+            sid = session_store.new_session_id()
+            qs, answers, feedbacks, digests = session_texts(n, args.questions)
+            sessions.append({"questions": TextSeq(sid, qs), "responses": TextSeq(sid, answers),
+                             "feedbacks": TextSeq(sid, feedbacks), "digests": TextSeq(sid, digests),
+                             "scores": [7] * args.questions})
+        # What the next rerun does; until then the texts are queued in memory
+        session_store.flush_texts()
+        return sessions
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.configure(os.path.join(tmp, "sessions.db"))
+        db.init_db()
+        _, plain_size = measure(plain)
+        sessions, compact_size = measure(compact)
+
+        # Rendering one session's latest feedback is an LRU hit or one indexed read
+        sample = sessions[0]["feedbacks"][-1]
+        assert sample.startswith(FEEDBACK[:20])
+        entries = session_store.cache_stats()["entries"]
+        db.close_all()
+
+    total = args.sessions
+    print(f"{total} sessions x {args.questions} questions")
+    print(f"plain lists: {plain_size / 1e6:8.2f} MB ({plain_size / total / 1024:6.1f} KB/session)")
+    print(f"TextSeq:     {compact_size / 1e6:8.2f} MB ({compact_size / total / 1024:6.1f} KB/session, "
+          f"text LRU capped at {session_store.TEXT_CACHE_ENTRIES} entries, {entries} held)")
+
+
+if __name__ == "__main__":
+    main()
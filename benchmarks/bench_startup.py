@@ -0,0 +1,65 @@
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Each probe runs in a fresh interpreter so module caches don't hide cold-start cost
+IMPORT_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import bot
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "deferred": [m for m in ("huggingface_hub", "fpdf") if m not in sys.modules]}))
+"""
+
+RENDER_PROBE = """
+import time, json
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+at = AppTest.from_file(%r, default_timeout=60)
+at.run()
+first = time.perf_counter() - start
+start = time.perf_counter()
+at.run()
+second = time.perf_counter() - start
+print(json.dumps({"seconds": first, "rerun": second, "exceptions": len(at.exception)}))
+"""
+
+
+def probe(code, cwd):
+    env = {**os.environ, "PYTHONPATH": ROOT, "HF_TOKEN": ""}
+    out = subprocess.run([sys.executable, "-c", code], cwd=cwd, env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start cost: importing bot and the first app render")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import", type=float, default=None, help="fail if median import time exceeds this (s)")
+    parser.add_argument("--max-render", type=float, default=None, help="fail if median first render exceeds this (s)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        imports = [probe(IMPORT_PROBE, tmp) for _ in range(args.runs)]
+        renders = [probe(RENDER_PROBE % os.path.join(ROOT, "app.py"), tmp) for _ in range(args.runs)]
+
+    import_median = statistics.median(r["seconds"] for r in imports)
+    render_median = statistics.median(r["seconds"] for r in renders)
+    print(f"import bot:    median {import_median * 1000:7.1f} ms  (deferred: {', '.join(imports[0]['deferred']) or 'none'})")
+    print(f"first render:  median {render_median * 1000:7.1f} ms")
+    print(f"warm rerun:    median {statistics.median(r['rerun'] for r in renders) * 1000:7.1f} ms")
+    if any(r["exceptions"] for r in renders):
+        sys.exit("app raised during render")
+    if args.max_import is not None and import_median > args.max_import:
+        sys.exit(f"import regression: {import_median:.3f}s > {args.max_import}s")
+    if args.max_render is not None and render_median > args.max_render:
+        sys.exit(f"first render regression: {render_median:.3f}s > {args.max_render}s")
+
+
+if __name__ == "__main__":
+    main()
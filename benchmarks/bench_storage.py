@@ -0,0 +1,101 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+import storage
+import session_store
+from bench_session_memory import session_texts
+
+
+def timed(fn, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def threaded(fn, threads, ops):
+    def worker():
+        for _ in range(ops):
+            fn()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker_thread in workers:
+        worker_thread.start()
+    for worker_thread in workers:
+        worker_thread.join()
+    return threads * ops / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared store: round trips, pipelining, pooling and cross-replica sessions")
+    parser.add_argument("--url", default="", help="redis://host:port/db of a real server; default: in-process fake server")
+    parser.add_argument("--keys", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--ops", type=int, default=200)
+    parser.add_argument("--sessions", type=int, default=50)
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if not url:
+        server = storage.FakeRedisServer().start()
+        url = server.url
+    replica_a, replica_b = storage.from_url(url), storage.from_url(url)
+    keys = [f"bench:{i}" for i in range(args.keys)]
+    replica_a.mset({key: "x" * 512 for key in keys})
+
+    def one_by_one():
+        return [replica_a.get(key) for key in keys]
+
+    def pipelined():
+        pipe = replica_a.pipeline()
+        for key in keys:
+            pipe.get(key)
+        return pipe.execute()
+
+    single_ms, _ = timed(one_by_one, 5)
+    mget_ms, _ = timed(lambda: replica_a.mget(keys), 5)
+    pipe_ms, _ = timed(pipelined, 5)
+
+    pooled = storage.RedisStore(replica_a.host, replica_a.port, replica_a.db, pool_size=args.threads)
+    unpooled = storage.RedisStore(replica_a.host, replica_a.port, replica_a.db, pool_size=0)
+    pooled_rate = threaded(lambda: pooled.get(keys[0]), args.threads, args.ops)
+    unpooled_rate = threaded(lambda: unpooled.get(keys[0]), args.threads, args.ops)
+
+    # Sessions saved through one replica and resumed through the other
+    with tempfile.TemporaryDirectory() as tmp:
+        db.configure(os.path.join(tmp, "storage.db"))
+        storage.set_store(replica_a)
+        texts = []
+        for n in range(args.sessions):
+            qs, answers, feedbacks, digests = session_texts(n, 10)
+            texts.append({"questions": qs, "responses": answers, "feedbacks": feedbacks, "digests": digests})
+        save_ms, _ = timed(lambda: [session_store.save_snapshot(f"user{n}", {"step": "interview"}, t) for n, t in enumerate(texts)])
+        storage.set_store(replica_b)
+        load_ms, loaded = timed(lambda: [session_store.load_snapshot(f"user{n}") for n in range(args.sessions)])
+        assert all(snapshot[1]["feedbacks"] == t["feedbacks"] for snapshot, t in zip(loaded, texts))
+        db.close_all()
+
+    replica_a.delete(*keys)
+    if server is not None:
+        server.stop()
+
+    print(f"{'fake server (in-process)' if server else url}, {args.keys} keys of 512 B")
+    print(f"{args.keys} GETs, one round trip each: {single_ms:8.2f} ms")
+    print(f"one MGET:                          {mget_ms:8.2f} ms")
+    print(f"{args.keys} GETs in one pipeline:       {pipe_ms:8.2f} ms")
+    print(f"{args.threads} threads x {args.ops} GETs, pooled:     {pooled_rate:8.0f} ops/s")
+    print(f"{args.threads} threads x {args.ops} GETs, no pooling: {unpooled_rate:8.0f} ops/s")
+    print(f"{args.sessions} sessions (10 questions) saved on replica A: {save_ms / args.sessions:6.2f} ms/session, "
+          f"resumed on replica B: {load_ms / args.sessions:6.2f} ms/session")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from write_buffer import WriteBehindBuffer
+from bench_db import ENTRY
+
+
+def submit_all(record, users, answers):
+    def user(n):
+        for _ in range(answers):
+            record(f"user{n}", ENTRY)
+
+    threads = [threading.Thread(target=user, args=(n,)) for n in range(users)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-answer commits vs the write-behind buffer")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--answers", type=int, default=10)
+    args = parser.parse_args()
+    total = args.users * args.answers
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.configure(os.path.join(tmp, "direct.db"))
+        db.init_db()
+
+        def direct(user_id, entry):
+            db.save_history(user_id, entry)
+            db.save_leaderboard(user_id, entry["score"])
+
+        elapsed = submit_all(direct, args.users, args.answers)
+        print(f"{'direct':<22}{total / elapsed:>10.0f} answers/s  {total * 2:>6} commits")
+
+        for mode in ("immediate", "buffered"):
+            db.configure(os.path.join(tmp, f"{mode}.db"))
+            db.init_db()
+            buffer = WriteBehindBuffer(durability=mode)
+            start = time.perf_counter()
+            submit_all(buffer.record_answer, args.users, args.answers)
+            buffer.flush()
+            elapsed = time.perf_counter() - start
+            print(f"{'write-behind ' + mode:<22}{total / elapsed:>10.0f} answers/s  {buffer.commits:>6} commits")
+        db.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import os
+import time
+import argparse
+import tempfile
+import threading
+from collections import defaultdict
+
+from stub_client import StubInferenceClient, install
+
+import bot
+import db
+import export
+import inference
+import metrics
+import prefetch
+import write_buffer
+
+STEPS = ("selection", "answer", "digest", "rerun_reads", "summary", "pdf_export")
+ROLES = ("Software Engineer", "Product Manager", "Data Analyst")
+
+
+def percentile(values, p):
+    # Nearest-rank percentile of an unsorted list
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, round(p / 100 * len(ordered)) - 1))]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.failures = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def step(self, name, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        except Exception:
+            with self._lock:
+                self.failures[name] += 1
+            raise
+        finally:
+            with self._lock:
+                self.latencies[name].append(time.perf_counter() - start)
+
+
+def candidate(n, args, recorder):
+    # One user's full flow: selection -> interview -> summary -> PDF export,
+    # with the history/leaderboard reads every rerun does after each answer
+    user_id = f"user{n}"
+    role = ROLES[n % len(ROLES)] if args.shared_settings else f"Role {n}"
+    mode = "Technical Interview"
+    questions, _ = recorder.step(
+        "selection", prefetch.take_questions, role, "", mode, "Standard", "Medium", args.questions, user_id
+    )
+    responses, feedbacks, digests = [], [], []
+    for i, question in enumerate(questions):
+        answer = f"Answer {i + 1} from {user_id}: it depends on the constraints."
+        feedback, score = recorder.step("answer", bot.evaluate_answer, question, answer, mode)
+        write_buffer.record_answer(user_id, {
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"), "role": role, "mode": mode,
+            "question_set": "Standard", "difficulty": "Medium", "question": question, "answer": answer,
+            "feedback": feedback, "score": score
+        })
+        responses.append(answer)
+        feedbacks.append(feedback)
+        digests.append(recorder.step("digest", bot.digest_answer, question, answer, feedback, score))
+        recorder.step("rerun_reads", lambda: (db.load_history_page(user_id), db.load_top_leaderboard(5)))
+    write_buffer.flush()
+    summary = recorder.step(
+        "summary", lambda: bot.generate_summary(
+            role, mode, questions, responses, feedbacks, "Standard", "Medium", digests=digests
+        )
+    )
+    recorder.step("pdf_export", lambda: export.export_pdf(user_id, user_id, role, mode, summary).result())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test: N concurrent candidates through the full interview flow")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--questions", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.2, help="stub LLM latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of LLM calls failing with 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of LLM calls failing with 429")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--rate", type=float, default=1000.0, help="gateway token-bucket rate (requests/s)")
+    parser.add_argument("--backoff-base", type=float, default=0.05, help="gateway backoff base in seconds")
+    parser.add_argument("--cache", action="store_true", help="keep the LLM response cache on")
+    parser.add_argument("--shared-settings", action="store_true",
+                        help="users share a few sidebar settings (exercises the question bank and coalescing)")
+    args = parser.parse_args()
+
+    stub = install(StubInferenceClient(
+        latency=args.latency, error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate, seed=args.seed
+    ))
+    inference.bucket = inference.TokenBucket(args.rate, max(1, int(args.rate)))
+    inference.BACKOFF_BASE = args.backoff_base
+    if not args.cache:
+        inference.cache = None
+
+    recorder = Recorder()
+    with tempfile.TemporaryDirectory() as tmp:
+        db.configure(os.path.join(tmp, "loadtest.db"))
+        db.init_db()
+        threads = [
+            threading.Thread(target=candidate, args=(n, args, recorder), name=f"user{n}")
+            for n in range(args.users)
+        ]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        db.close_all()
+
+    completed = len(recorder.latencies["pdf_export"]) - recorder.failures["pdf_export"]
+    print(f"{args.users} users x {args.questions} questions, stub latency {args.latency * 1000:.0f} ms, "
+          f"errors {args.error_rate:.0%}, 429s {args.rate_limit_rate:.0%}")
+    print(f"wall time {elapsed:.2f} s, {completed} interviews completed, "
+          f"{completed / elapsed:.2f} interviews/s, {stub.calls / elapsed:.1f} LLM calls/s")
+    print(f"{'step':<12} {'count':>6} {'fail':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name in STEPS:
+        values = recorder.latencies[name]
+        print(f"{name:<12} {len(values):>6} {recorder.failures[name]:>5} "
+              f"{percentile(values, 50) * 1000:>9.1f} {percentile(values, 95) * 1000:>9.1f} {percentile(values, 99) * 1000:>9.1f}")
+
+    count, total = db.LOCK_WAIT.summary()
+    over = {bound: count - below for bound, below in db.LOCK_WAIT.cumulative() if bound in (0.001, 0.01, 0.1)}
+    print(f"sqlite write locks: {count} acquired, {total * 1000:.1f} ms waiting in total, "
+          f"{over[0.001]} waited >1 ms, {over[0.01]} >10 ms, {over[0.1]} >100 ms, "
+          f"{db.LOCK_ERRORS.value()} gave up (database is locked)")
+    stats = inference.stats()
+    print("gateway: " + ", ".join(f"{k}={v}" for k, v in sorted(stats.items())))
+    print(f"stub: {stub.calls} calls, {stub.errors} injected 503s, {stub.rate_limits} injected 429s, "
+          f"{metrics.DUMMY_FALLBACKS.value(function='evaluate_answer', reason='retries_exhausted')} evaluations fell back")
+
+
+if __name__ == "__main__":
+    main()
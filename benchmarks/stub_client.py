@@ -0,0 +1,56 @@
+import os
+import sys
+import time
+import random
+import threading
+from types import SimpleNamespace
+
+# Benchmarks run from anywhere; make the app modules importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backends
+
+
+class StubHTTPError(Exception):
+    # Carries a response with status_code/headers, like huggingface_hub's HTTP errors
+    def __init__(self, status_code, message, retry_after=None):
+        super().__init__(f"{status_code} {message}")
+        headers = {"Retry-After": str(retry_after)} if retry_after is not None else {}
+        self.response = SimpleNamespace(status_code=status_code, headers=headers)
+
+
+class StubInferenceClient(backends.FakeClient):
+    # backends.FakeClient's deterministic answers, plus what a real upstream adds:
+    # `latency` seconds per call, and 503s / 429s injected at error_rate /
+    # rate_limit_rate (after the latency); seed makes the injected failures repeatable.
+    def __init__(self, latency=0.5, error_rate=0.0, rate_limit_rate=0.0, retry_after=None, seed=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.calls = 0
+        self.errors = 0
+        self.rate_limits = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def chat_completion(self, messages, model=None, max_tokens=512, temperature=1, stream=False, **kwargs):
+        with self._lock:
+            self.calls += 1
+            roll = self._random.random()
+        time.sleep(self.latency)
+        if roll < self.rate_limit_rate:
+            with self._lock:
+                self.rate_limits += 1
+            raise StubHTTPError(429, "Too Many Requests", self.retry_after)
+        if roll < self.rate_limit_rate + self.error_rate:
+            with self._lock:
+                self.errors += 1
+            raise StubHTTPError(503, "Service Unavailable")
+        return super().chat_completion(messages, model=model, max_tokens=max_tokens, temperature=temperature, stream=stream, **kwargs)
+
+
+def install(stub):
+    import bot
+    bot.set_client(stub)
+    return stub
@@ -1,136 +1,294 @@
 import os
-import time
 import re
-import sqlite3
-from huggingface_hub import InferenceClient
+import json
+import threading
 from dotenv import load_dotenv
 import streamlit as st
+import backends
+import inference
+import llm_cache
+import metrics
+import question_bank
+import storage
+import structured
 
 # Load environment variables
 load_dotenv()
 
-# Get Hugging Face token: Use st.secrets in cloud, fallback to env
-if "HF_TOKEN" in st.secrets:
-    token = st.secrets["HF_TOKEN"]
-else:
-    token = os.getenv("HF_TOKEN")
-
-# Validate token early
-if not token:
-    st.error("HF_TOKEN is missing. Please set it in Streamlit secrets (cloud) or .env file (local). Get a free token from https://huggingface.co/settings/tokens")
-    client = None
-else:
+# With a shared STORAGE_URL (see storage.py), cached answers live in the shared
+# store, so a question generated on one replica is reused by all of them
+if storage.shared():
+    inference.cache = llm_cache.SharedResponseCache(storage.get_store())
+
+# The inference client is created on first use, once per process, so importing
+# this module stays cheap and has no UI side effects. Tests and benchmarks can
+# install their own client with set_client().
+client = None
+client_error = None
+_client_ready = False
+_client_lock = threading.Lock()
+
+def _get_token():
+    # Get Hugging Face token: Use st.secrets in cloud, fallback to env
+    try:
+        return st.secrets["HF_TOKEN"] if "HF_TOKEN" in st.secrets else os.getenv("HF_TOKEN")
+    except FileNotFoundError:
+        # No secrets.toml at all (local runs, benchmarks)
+        return os.getenv("HF_TOKEN")
+
+def _create_client():
+    # Provider comes from LLM_PROVIDER (hf, local or fake); see backends.py
+    return backends.create_client(_get_token)
+
+def get_client():
+    global client, client_error, _client_ready
+    if not _client_ready:
+        with _client_lock:
+            if not _client_ready:
+                client, client_error = _create_client()
+                _client_ready = True
+    return client
+
+def set_client(new_client):
+    global client, client_error, _client_ready
+    with _client_lock:
+        client, client_error, _client_ready = new_client, None, True
+
+def get_client_error():
+    # None until the client has been created, so checking this never forces creation
+    return client_error
+
+# Each call routes through backends.model_for(task) so scoring can use a small fast
+# model and summaries a large one (LLM_MODEL_EVALUATE, LLM_MODEL_SUMMARY, ...)
+DIGEST_MAX_TOKENS = 96
+SUMMARY_MAX_TOKENS = 1024
+# Structured output: questions and (non-streamed) evaluations come back as JSON.
+# Short or unparseable output is repaired with a follow-up for just the missing
+# part (QUESTION_REPAIRS rounds for questions, one score-only call for evaluations).
+QUESTION_REPAIRS = 2
+SCORE_MAX_TOKENS = 16
+
+def _stream(messages, use_cache, action, function, task, max_tokens=512):
+    # Timed from the request to the last chunk, so the histogram covers the whole stream
     try:
-        # Test client initialization with token
-        client = InferenceClient(token=token)
-        # Optional: Test a simple call to verify (comment out if rate limits are an issue)
-        # _ = client.text_generation("Test", model="gpt2", max_new_tokens=1)
-        st.success("Hugging Face client initialized successfully.")  # Remove in production
+        with metrics.timed("interview_function_seconds", function=function):
+            yield from inference.stream(get_client(), messages, backends.model_for(task), max_tokens=max_tokens, use_cache=use_cache)
+    except inference.InferenceUnavailable:
+        metrics.DUMMY_FALLBACKS.inc(function=function, reason="retries_exhausted")
+        yield f"Error: Failed to {action} after retries"
     except Exception as e:
-        st.error(f"Invalid HF_TOKEN: {str(e)}. Regenerate a new token at https://huggingface.co/settings/tokens and ensure you've accepted the model terms at https://huggingface.co/mistralai/Mistral-7B-Instruct-v0.3")
-        client = None
-
-def init_db():
-    conn = sqlite3.connect("interview.db")
-    c = conn.cursor()
-    c.execute("""CREATE TABLE IF NOT EXISTS history (
-        user_id TEXT, 
-        timestamp TEXT, 
-        role TEXT, 
-        mode TEXT, 
-        question_set TEXT, 
-        question TEXT, 
-        answer TEXT, 
-        feedback TEXT, 
-        score INTEGER
-    )""")
-    c.execute("""CREATE TABLE IF NOT EXISTS leaderboard (
-        user_id TEXT PRIMARY KEY, 
-        total_score INTEGER, 
-        attempts INTEGER
-    )""")
-    conn.commit()
-    conn.close()
-
-def generate_questions(role, domain, mode, num_questions=5, question_set="Standard", difficulty="Medium"):
+        raise RuntimeError(f"Failed to {action}: {e}")
+
+def parse_score(feedback):
+    # Tolerant: "Score: 7/10", "7 out of 10", {"score": 7}, ...; 0 when there is no score at all
+    score = structured.parse_score(feedback or "")
+    structured.PARSES.inc(kind="score", outcome="failed" if score is None else "text")
+    return score or 0
+
+def _validate_settings(role, domain):
     if not role.strip() or len(role) > 100:
         raise ValueError("Role must be 1-100 characters")
     if domain and len(domain) > 100:
         raise ValueError("Domain must be 1-100 characters")
+
+@metrics.timed("interview_function_seconds", function="get_questions")
+def get_questions(role, domain, mode, num_questions=5, question_set="Standard", difficulty="Medium", user_id=None):
+    # Serve from the question bank when it has enough questions this user hasn't seen;
+    # otherwise generate live and keep the new questions for next time.
+    # Returns (questions, warning) like generate_questions.
+    _validate_settings(role, domain)
+    questions = question_bank.sample_questions(role, domain, mode, question_set, difficulty, num_questions, user_id)
+    if len(questions) == num_questions:
+        return questions, None
+    # Refreshed: the cached list for these settings is the one already added to the
+    # bank, which this user has seen; concurrent identical requests still share one call
+    questions, warning = generate_questions(role, domain, mode, num_questions, question_set, difficulty, refresh=True)
+    if get_client() is not None and warning is None:
+        question_bank.add_questions(role, domain, mode, question_set, difficulty, questions)
+    return questions, warning
+
+@metrics.timed("interview_function_seconds", function="generate_questions")
+def generate_questions(role, domain, mode, num_questions=5, question_set="Standard", difficulty="Medium", use_cache=True, refresh=False):
+    # Returns (questions, warning): warning says why placeholder questions were used, else None.
+    # It is returned rather than shown because this often runs on a prefetch thread,
+    # where st.warning() has no page to write to.
+    _validate_settings(role, domain)
     
-    if client is None:
-        st.warning("Using dummy questions due to missing/invalid HF_TOKEN.")
-        return [f"Dummy question {i + 1}: Describe a {mode.lower()} challenge for {role} role" for i in range(num_questions)]
+    if get_client() is None:
+        # Offline: any bank questions beat placeholders
+        questions = question_bank.sample_questions(role, domain, mode, question_set, difficulty, num_questions)
+        if len(questions) == num_questions:
+            return questions, None
+        metrics.DUMMY_FALLBACKS.inc(function="generate_questions", reason="no_client")
+        return _dummy_questions(role, mode, num_questions), "Using dummy questions due to missing/invalid HF_TOKEN."
     
-    prompt = (
-        f"Generate exactly {num_questions} {'technical' if mode == 'Technical Interview' else 'behavioral'} "
-        f"interview questions for a {role} role in {domain if domain else 'general software engineering'} "
-        f"using {question_set} style at {difficulty} difficulty. "
-        f"Format as a numbered list (e.g., '1. Question text'). "
-        f"Ensure each question is non-empty and starts with a number."
-    )
-    for attempt in range(3):
+    questions = []
+    for attempt in range(1 + QUESTION_REPAIRS):
+        # Later rounds only ask for what is still missing; no backoff, a parse failure isn't an outage
         try:
-            response = client.chat_completion(
-                messages=[
-                    {"role": "system", "content": "You are an interview question generator. Return questions in a numbered list format (e.g., '1. Question text')."},
-                    {"role": "user", "content": prompt}
-                ],
-                model="mistralai/Mistral-7B-Instruct-v0.3",
-                max_tokens=512,
-                temperature=1
+            content = inference.complete(
+                get_client(),
+                _question_messages(role, domain, mode, num_questions - len(questions), question_set, difficulty, questions),
+                backends.model_for("questions"),
+                use_cache=use_cache,
+                refresh=refresh,
+                validate=lambda text, wanted=num_questions - len(questions): len(structured.parse_questions(text)[0]) >= wanted
             )
-            content = response.choices[0].message.content.strip()
-            questions = [q.strip() for q in content.split("\n") if q.strip() and q[0].isdigit()]
-            if len(questions) >= num_questions:
-                return questions[:num_questions]
-            time.sleep(2 ** attempt)
+        except inference.InferenceUnavailable:
+            break
         except Exception as e:
-            if "rate limit" in str(e).lower() or "unauthorized" in str(e).lower():
-                time.sleep(2 ** attempt)
-                continue
             raise RuntimeError(f"Failed to generate questions: {e}")
-    st.warning("Using dummy questions after API retries failed.")
+        parsed, outcome = structured.parse_questions(content)
+        structured.PARSES.inc(kind="questions", outcome=outcome)
+        questions += [q for q in parsed if q not in questions][:num_questions - len(questions)]
+        if len(questions) == num_questions:
+            return [f"{i + 1}. {q}" for i, q in enumerate(questions)], None
+        structured.PARSES.inc(kind="questions", outcome="short")
+    metrics.DUMMY_FALLBACKS.inc(function="generate_questions", reason="retries_exhausted")
+    return _dummy_questions(role, mode, num_questions), "Using dummy questions after API retries failed."
+
+def _dummy_questions(role, mode, num_questions):
     return [f"Dummy question {i + 1}: Describe a {mode.lower()} challenge for {role} role" for i in range(num_questions)]
 
-def evaluate_answer(question, answer, mode):
+def _question_messages(role, domain, mode, count, question_set, difficulty, existing=()):
+    prompt = (
+        f"Generate exactly {count} {'technical' if mode == 'Technical Interview' else 'behavioral'} "
+        f"interview questions for a {role} role in {domain if domain else 'general software engineering'} "
+        f"using {question_set} style at {difficulty} difficulty. "
+        f'Respond with JSON only, matching this schema: {{"questions": [string]}} with exactly {count} non-empty questions.'
+    )
+    if existing:
+        prompt += " Do not repeat any of these: " + json.dumps(list(existing))
+    return [
+        {"role": "system", "content": "You are an interview question generator. Reply with a single JSON object and nothing else."},
+        {"role": "user", "content": prompt}
+    ]
+
+def _evaluation_messages(question, answer, mode, as_json=True):
+    prompt = (
+        f"Evaluate this {'technical' if mode == 'Technical Interview' else 'behavioral'} interview answer for question: '{question}'\n"
+        f"Answer: '{answer}'\n"
+        f"Assess clarity, correctness, completeness, and technical accuracy. "
+    )
+    if as_json:
+        prompt += (
+            'Respond with JSON only, matching this schema: '
+            '{"feedback": string (detailed, plain text), "score": integer 0-10, "suggestions": string}.'
+        )
+        system = "You are an interview evaluator. Reply with a single JSON object and nothing else."
+    else:
+        # Streamed to the user as it is written, so plain text with a parseable score line
+        prompt += "Provide detailed feedback, then a line 'Score: N/10', then suggestions, in plain text."
+        system = "You are an interview evaluator. Provide feedback in plain text, avoiding markdown tables."
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": prompt}
+    ]
+
+def _score_messages(question, feedback):
+    prompt = (
+        f"Question: '{question}'\nFeedback: '{feedback}'\n"
+        f'Score this feedback\'s verdict on the answer. Respond with JSON only: {{"score": integer 0-10}}.'
+    )
+    return [
+        {"role": "system", "content": "You convert interview feedback into a score. Reply with a single JSON object."},
+        {"role": "user", "content": prompt}
+    ]
+
+def _repair_score(question, feedback, use_cache):
+    # The evaluation came back without a usable score: ask for just the score instead of re-evaluating
+    try:
+        content = inference.complete(
+            get_client(), _score_messages(question, feedback), backends.model_for("evaluate"),
+            max_tokens=SCORE_MAX_TOKENS, temperature=0, use_cache=use_cache,
+            validate=lambda text: structured.parse_score(text) is not None
+        )
+    except Exception:
+        return None
+    return structured.parse_score(content)
+
+@metrics.timed("interview_function_seconds", function="evaluate_answer")
+def evaluate_answer(question, answer, mode, use_cache=True):
     if not answer.strip():
         raise ValueError("Answer cannot be empty")
     
-    if client is None:
+    if get_client() is None:
+        metrics.DUMMY_FALLBACKS.inc(function="evaluate_answer", reason="no_client")
         return "Evaluation unavailable due to missing HF_TOKEN. Please provide a valid token.", 0
     
+    try:
+        content = inference.complete(
+            get_client(), _evaluation_messages(question, answer, mode), backends.model_for("evaluate"), use_cache=use_cache,
+            validate=lambda text: structured.parse_evaluation(text)[1] is not None
+        )
+    except inference.InferenceUnavailable:
+        metrics.DUMMY_FALLBACKS.inc(function="evaluate_answer", reason="retries_exhausted")
+        return "Error: Failed to evaluate answer after retries", 0
+    except Exception as e:
+        raise RuntimeError(f"Failed to evaluate answer: {e}")
+    feedback, score, suggestions, outcome = structured.parse_evaluation(content)
+    structured.PARSES.inc(kind="evaluation", outcome=outcome)
+    if score is None:
+        score = _repair_score(question, feedback, use_cache)
+        structured.PARSES.inc(kind="score", outcome="failed" if score is None else "repaired")
+    # Stored and shown as plain text; the score line keeps parse_score() working on history
+    feedback = f"{feedback}\nScore: {score or 0}/10"
+    if suggestions:
+        feedback += f"\nSuggestions: {suggestions}"
+    return feedback, score or 0
+
+def evaluate_answer_stream(question, answer, mode, use_cache=True):
+    # Yields feedback text as it is generated; score the joined text with parse_score()
+    if not answer.strip():
+        raise ValueError("Answer cannot be empty")
+
+    if get_client() is None:
+        metrics.DUMMY_FALLBACKS.inc(function="evaluate_answer_stream", reason="no_client")
+        yield "Evaluation unavailable due to missing HF_TOKEN. Please provide a valid token."
+        return
+
+    yield from _stream(_evaluation_messages(question, answer, mode, as_json=False), use_cache, "evaluate answer", "evaluate_answer_stream", "evaluate")
+
+def _first_sentence(text, limit):
+    # Leading list numbering ("1. ") would otherwise count as a sentence
+    text = re.sub(r"^\d+[.)]\s*", "", text.strip())
+    sentence = re.split(r"(?<=[.!?])\s+", text, maxsplit=1)[0]
+    return sentence if len(sentence) <= limit else sentence[:limit - 3].rstrip() + "..."
+
+def extractive_digest(question, answer, feedback, score):
+    # No-LLM fallback: the question's first sentence, the score and the feedback's first sentence
+    if answer == "Skipped":
+        return f"{_first_sentence(question, 120)} | Skipped"
+    return f"{_first_sentence(question, 120)} | Score: {score}/10 | {_first_sentence(feedback or '', 200)}"
+
+def _digest_messages(question, answer, feedback, score):
     prompt = (
-        f"Evaluate this {'technical' if mode == 'Technical Interview' else 'behavioral'} interview answer for question: '{question}'\n"
-        f"Answer: '{answer}'\n"
-        f"Assess clarity, correctness, completeness, and technical accuracy. Provide detailed feedback, a score out of 10, and suggestions in plain text."
+        f"Question: '{question}'\nAnswer: '{answer}'\nFeedback: '{feedback}'\nScore: {score}/10\n"
+        f"Condense this evaluated interview answer into at most two short sentences: the topic, "
+        f"the main strength, the main gap. Plain text only."
     )
-    for attempt in range(3):
-        try:
-            response = client.chat_completion(
-                messages=[
-                    {"role": "system", "content": "You are an interview evaluator. Provide feedback in plain text, avoiding markdown tables."},
-                    {"role": "user", "content": prompt}
-                ],
-                model="mistralai/Mistral-7B-Instruct-v0.3",
-                max_tokens=512,
-                temperature=1
-            )
-            feedback = response.choices[0].message.content.strip()
-            score_match = re.search(r"Score:\s*(\d+)/10", feedback)
-            score = int(score_match.group(1)) if score_match else 0
-            return feedback, score
-        except Exception as e:
-            if "rate limit" in str(e).lower() or "unauthorized" in str(e).lower():
-                time.sleep(2 ** attempt)
-                continue
-            raise RuntimeError(f"Failed to evaluate answer: {e}")
-    return "Error: Failed to evaluate answer after retries", 0
-
-def generate_summary(role, mode, questions, responses, feedbacks, question_set="Standard", difficulty="Medium"):
-    if client is None:
-        return "Summary unavailable due to missing HF_TOKEN. Please provide a valid token. General advice: Practice more on key areas."
-    
+    return [
+        {"role": "system", "content": "You condense interview evaluations into brief notes for a final summary."},
+        {"role": "user", "content": prompt}
+    ]
+
+@metrics.timed("interview_function_seconds", function="digest_answer")
+def digest_answer(question, answer, feedback, score, use_cache=True):
+    # Compact per-question note, made right after evaluation so the final summary
+    # only merges short digests. Never raises: falls back to an extractive digest.
+    if answer == "Skipped" or get_client() is None:
+        return extractive_digest(question, answer, feedback, score)
+    try:
+        digest = inference.complete(
+            get_client(), _digest_messages(question, answer, feedback, score), backends.model_for("digest"),
+            max_tokens=DIGEST_MAX_TOKENS, temperature=0.3, use_cache=use_cache
+        )
+    except Exception:
+        metrics.DUMMY_FALLBACKS.inc(function="digest_answer", reason="extractive")
+        return extractive_digest(question, answer, feedback, score)
+    return f"Score: {score}/10. {digest}" if digest else extractive_digest(question, answer, feedback, score)
+
+def _summary_messages(role, mode, questions, responses, feedbacks, question_set, difficulty, digests=None):
     if not responses or all(r == "Skipped" for r in responses):
         prompt = (
             f"The user skipped all questions in an interview for a {role} role in {mode} mode with {question_set} question set at {difficulty} difficulty. "
@@ -139,27 +297,44 @@ def generate_summary(role, mode, questions, responses, feedbacks, question_set="
         )
     else:
         prompt = f"Summarize the interview for a {role} in {mode} mode with {question_set} question set at {difficulty} difficulty.\n"
-        for i, (q, resp, fb) in enumerate(zip(questions, responses, feedbacks)):
-            prompt += f"Question {i+1}: {q}\nResponse: {resp}\nFeedback: {fb}\n\n"
+        if digests is not None:
+            # One short digest per question, so the prompt doesn't grow with answer length
+            for i, (q, resp, fb) in enumerate(zip(questions, responses, feedbacks)):
+                digest = digests[i] if i < len(digests) and digests[i] else extractive_digest(q, resp, fb, parse_score(fb or ""))
+                prompt += f"Question {i+1}: {digest}\n"
+            prompt += "\n"
+        else:
+            for i, (q, resp, fb) in enumerate(zip(questions, responses, feedbacks)):
+                prompt += f"Question {i+1}: {q}\nResponse: {resp}\nFeedback: {fb}\n\n"
         prompt += (
             "Generate a professional summary in plain text with sections: Questions and Responses, Areas of Strength, "
             "Areas to Improve, Suggested Resources, Overall Score. Use bullet points and regular hyphens."
         )
-    for attempt in range(3):
-        try:
-            response = client.chat_completion(
-                messages=[
-                    {"role": "system", "content": "You are an interview summarizer. Format output as plain text with bullet points under headers, avoiding markdown tables."},
-                    {"role": "user", "content": prompt}
-                ],
-                model="mistralai/Mistral-7B-Instruct-v0.3",
-                max_tokens=512,
-                temperature=1
-            )
-            return response.choices[0].message.content.strip()
-        except Exception as e:
-            if "rate limit" in str(e).lower() or "unauthorized" in str(e).lower():
-                time.sleep(2 ** attempt)
-                continue
-            raise RuntimeError(f"Failed to generate summary: {e}")
-    return "Error: Failed to generate summary after retries"
\ No newline at end of file
+    return [
+        {"role": "system", "content": "You are an interview summarizer. Format output as plain text with bullet points under headers, avoiding markdown tables."},
+        {"role": "user", "content": prompt}
+    ]
+
+@metrics.timed("interview_function_seconds", function="generate_summary")
+def generate_summary(role, mode, questions, responses, feedbacks, question_set="Standard", difficulty="Medium", use_cache=True, digests=None):
+    if get_client() is None:
+        metrics.DUMMY_FALLBACKS.inc(function="generate_summary", reason="no_client")
+        return "Summary unavailable due to missing HF_TOKEN. Please provide a valid token. General advice: Practice more on key areas."
+    
+    messages = _summary_messages(role, mode, questions, responses, feedbacks, question_set, difficulty, digests)
+    try:
+        return inference.complete(get_client(), messages, backends.model_for("summary"), max_tokens=SUMMARY_MAX_TOKENS, use_cache=use_cache)
+    except inference.InferenceUnavailable:
+        metrics.DUMMY_FALLBACKS.inc(function="generate_summary", reason="retries_exhausted")
+        return "Error: Failed to generate summary after retries"
+    except Exception as e:
+        raise RuntimeError(f"Failed to generate summary: {e}")
+
+def generate_summary_stream(role, mode, questions, responses, feedbacks, question_set="Standard", difficulty="Medium", use_cache=True, digests=None):
+    if get_client() is None:
+        metrics.DUMMY_FALLBACKS.inc(function="generate_summary_stream", reason="no_client")
+        yield "Summary unavailable due to missing HF_TOKEN. Please provide a valid token. General advice: Practice more on key areas."
+        return
+
+    messages = _summary_messages(role, mode, questions, responses, feedbacks, question_set, difficulty, digests)
+    yield from _stream(messages, use_cache, "generate summary", "generate_summary_stream", "summary", SUMMARY_MAX_TOKENS)
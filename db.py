@@ -0,0 +1,574 @@
+import os
+import re
+import json
+import queue
+import sqlite3
+import time
+import threading
+from contextlib import contextmanager
+
+import metrics
+import storage
+
+# Data-access layer for interview.db. Connections are pooled and reused across
+# reruns and sessions instead of being opened and closed per call.
+DB_PATH = os.getenv("INTERVIEW_DB", "interview.db")
+POOL_SIZE = int(os.getenv("INTERVIEW_DB_POOL_SIZE", "8"))
+STATEMENT_CACHE_SIZE = 256
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",  # Safe with WAL; only the last commits can be lost on power failure
+    "PRAGMA cache_size=-16000",  # ~16 MB page cache per connection
+    "PRAGMA mmap_size=268435456",  # 256 MB
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+# Schema changes, applied in order and tracked with PRAGMA user_version.
+# Append new migrations; never edit one that has shipped.
+MIGRATIONS = [
+    (
+        """CREATE TABLE IF NOT EXISTS history (
+            user_id TEXT,
+            timestamp TEXT,
+            role TEXT,
+            mode TEXT,
+            question_set TEXT,
+            question TEXT,
+            answer TEXT,
+            feedback TEXT,
+            score INTEGER
+        )""",
+        """CREATE TABLE IF NOT EXISTS leaderboard (
+            user_id TEXT PRIMARY KEY,
+            total_score INTEGER,
+            attempts INTEGER
+        )""",
+    ),
+    (
+        # Serves the per-user, newest-first history pages without a sort
+        "CREATE INDEX IF NOT EXISTS idx_history_user_ts ON history (user_id, timestamp)",
+    ),
+    (
+        # Expression index on the average so the top-N is an index walk, not a sort
+        "CREATE INDEX IF NOT EXISTS idx_leaderboard_avg ON leaderboard ((CAST(total_score AS REAL) / attempts) DESC)",
+    ),
+    (
+        # Pre-generated questions; the UNIQUE constraint's index doubles as the
+        # lookup index on the interview settings
+        """CREATE TABLE IF NOT EXISTS question_bank (
+            id INTEGER PRIMARY KEY,
+            role TEXT,
+            domain TEXT,
+            mode TEXT,
+            question_set TEXT,
+            difficulty TEXT,
+            question TEXT,
+            created_at TEXT,
+            UNIQUE (role, domain, mode, question_set, difficulty, question)
+        )""",
+    ),
+    (
+        # Large per-session texts kept out of session state (see session_store.py)
+        """CREATE TABLE IF NOT EXISTS session_texts (
+            id INTEGER PRIMARY KEY,
+            session_id TEXT,
+            body TEXT,
+            updated_at REAL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_session_texts_session ON session_texts (session_id)",
+        "CREATE INDEX IF NOT EXISTS idx_session_texts_updated ON session_texts (updated_at)",
+    ),
+    (
+        # Saved sessions: a versioned header per user plus one row per text item
+        """CREATE TABLE IF NOT EXISTS session_snapshots (
+            user_id TEXT PRIMARY KEY,
+            version INTEGER,
+            state BLOB,
+            saved_at REAL
+        )""",
+        """CREATE TABLE IF NOT EXISTS session_snapshot_items (
+            user_id TEXT,
+            kind TEXT,
+            position INTEGER,
+            hash TEXT,
+            body BLOB,
+            PRIMARY KEY (user_id, kind, position)
+        )""",
+    ),
+    (
+        # Daily score rollups per user and for the whole cohort, keyed so a
+        # date-range scan for one user (or one day range) is a primary-key walk.
+        # The trigger keeps them current for every history insert, buffered or not.
+        "ALTER TABLE history ADD COLUMN difficulty TEXT",
+        """CREATE TABLE IF NOT EXISTS user_daily_scores (
+            user_id TEXT,
+            day TEXT,
+            role TEXT,
+            mode TEXT,
+            question_set TEXT,
+            difficulty TEXT,
+            attempts INTEGER,
+            total_score INTEGER,
+            PRIMARY KEY (user_id, day, role, mode, question_set, difficulty)
+        ) WITHOUT ROWID""",
+        """CREATE TABLE IF NOT EXISTS cohort_daily_scores (
+            day TEXT,
+            role TEXT,
+            mode TEXT,
+            question_set TEXT,
+            difficulty TEXT,
+            attempts INTEGER,
+            total_score INTEGER,
+            PRIMARY KEY (day, role, mode, question_set, difficulty)
+        ) WITHOUT ROWID""",
+        """CREATE TRIGGER IF NOT EXISTS trg_history_rollup AFTER INSERT ON history BEGIN
+            INSERT INTO user_daily_scores (user_id, day, role, mode, question_set, difficulty, attempts, total_score)
+            VALUES (NEW.user_id, substr(NEW.timestamp, 1, 10), COALESCE(NEW.role, ''), COALESCE(NEW.mode, ''),
+                    COALESCE(NEW.question_set, ''), COALESCE(NEW.difficulty, ''), 1, NEW.score)
+            ON CONFLICT (user_id, day, role, mode, question_set, difficulty) DO UPDATE SET
+                attempts = attempts + 1, total_score = total_score + excluded.total_score;
+            INSERT INTO cohort_daily_scores (day, role, mode, question_set, difficulty, attempts, total_score)
+            VALUES (substr(NEW.timestamp, 1, 10), COALESCE(NEW.role, ''), COALESCE(NEW.mode, ''),
+                    COALESCE(NEW.question_set, ''), COALESCE(NEW.difficulty, ''), 1, NEW.score)
+            ON CONFLICT (day, role, mode, question_set, difficulty) DO UPDATE SET
+                attempts = attempts + 1, total_score = total_score + excluded.total_score;
+        END""",
+        # Backfill from the history recorded so far
+        """INSERT INTO user_daily_scores
+            SELECT user_id, substr(timestamp, 1, 10), COALESCE(role, ''), COALESCE(mode, ''),
+                   COALESCE(question_set, ''), '', COUNT(*), SUM(score)
+            FROM history GROUP BY 1, 2, 3, 4, 5""",
+        """INSERT INTO cohort_daily_scores
+            SELECT substr(timestamp, 1, 10), COALESCE(role, ''), COALESCE(mode, ''),
+                   COALESCE(question_set, ''), '', COUNT(*), SUM(score)
+            FROM history GROUP BY 1, 2, 3, 4""",
+    ),
+    (
+        # Full-text index over history. External content: the index stores only
+        # tokens and reads the texts back from history by rowid, and the triggers
+        # keep it in step with every insert, update and delete. Questions weigh
+        # most in the ranking, feedback least. history has no INTEGER PRIMARY KEY,
+        # so run rebuild_search_index() after a VACUUM (which may renumber rowids).
+        """CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(
+            question, answer, feedback,
+            content='history', content_rowid='rowid', tokenize='porter unicode61'
+        )""",
+        "INSERT INTO history_fts (history_fts, rank) VALUES ('rank', 'bm25(2.0, 1.0, 0.5)')",
+        """CREATE TRIGGER IF NOT EXISTS trg_history_fts_insert AFTER INSERT ON history BEGIN
+            INSERT INTO history_fts (rowid, question, answer, feedback)
+            VALUES (NEW.rowid, NEW.question, NEW.answer, NEW.feedback);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_history_fts_delete AFTER DELETE ON history BEGIN
+            INSERT INTO history_fts (history_fts, rowid, question, answer, feedback)
+            VALUES ('delete', OLD.rowid, OLD.question, OLD.answer, OLD.feedback);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_history_fts_update AFTER UPDATE OF question, answer, feedback ON history BEGIN
+            INSERT INTO history_fts (history_fts, rowid, question, answer, feedback)
+            VALUES ('delete', OLD.rowid, OLD.question, OLD.answer, OLD.feedback);
+            INSERT INTO history_fts (rowid, question, answer, feedback)
+            VALUES (NEW.rowid, NEW.question, NEW.answer, NEW.feedback);
+        END""",
+        # Index the history recorded so far
+        "INSERT INTO history_fts (history_fts) VALUES ('rebuild')",
+    ),
+    (
+        # Row ids reserved in blocks per process, so session texts get their final
+        # ids up front and are written in batches (see session_store.py)
+        "CREATE TABLE IF NOT EXISTS id_blocks (name TEXT PRIMARY KEY, last_id INTEGER NOT NULL)",
+    ),
+]
+
+HISTORY_PAGE_SIZE = 5
+SEARCH_PAGE_SIZE = 10
+SEARCH_COLUMNS = ("question", "answer", "feedback")
+LEADERBOARD_CACHE_TTL = float(os.getenv("LEADERBOARD_CACHE_TTL", "5"))
+
+# SQL lives in constants so every call reuses the connection's prepared statement
+HISTORY_COLUMNS = "rowid, timestamp, role, mode, question_set, question, answer, feedback, score"
+SQL_LOAD_HISTORY = (
+    f"SELECT {HISTORY_COLUMNS} FROM history WHERE user_id = ? "
+    "ORDER BY timestamp DESC, rowid DESC"
+)
+SQL_HISTORY_FIRST_PAGE = (
+    f"SELECT {HISTORY_COLUMNS} FROM history WHERE user_id = ? "
+    "ORDER BY timestamp DESC, rowid DESC LIMIT ?"
+)
+SQL_HISTORY_PAGE_BEFORE = (
+    f"SELECT {HISTORY_COLUMNS} FROM history WHERE user_id = ? AND (timestamp, rowid) < (?, ?) "
+    "ORDER BY timestamp DESC, rowid DESC LIMIT ?"
+)
+SQL_HISTORY_SINCE = (
+    f"SELECT {HISTORY_COLUMNS} FROM history WHERE user_id = ? AND (timestamp, rowid) >= (?, ?) "
+    "ORDER BY timestamp DESC, rowid DESC"
+)
+SQL_FIND_ANSWER = (
+    f"SELECT {HISTORY_COLUMNS} FROM history WHERE user_id = ? AND question = ? AND answer = ? "
+    "ORDER BY timestamp DESC, rowid DESC LIMIT 1"
+)
+SQL_SAVE_HISTORY = (
+    "INSERT INTO history (user_id, timestamp, role, mode, question_set, difficulty, question, answer, feedback, score) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+# Daily (attempts, total) series from the rollups; a NULL filter matches every value
+ROLLUP_FILTERS = (
+    "AND (?3 IS NULL OR role = ?3) AND (?4 IS NULL OR mode = ?4) "
+    "AND (?5 IS NULL OR question_set = ?5) AND (?6 IS NULL OR difficulty = ?6) "
+)
+SQL_USER_TREND = (
+    "SELECT day, SUM(attempts), SUM(total_score) FROM user_daily_scores "
+    "WHERE user_id = ?7 AND day BETWEEN ?1 AND ?2 " + ROLLUP_FILTERS +
+    "GROUP BY day ORDER BY day"
+)
+SQL_COHORT_TREND = (
+    "SELECT day, SUM(attempts), SUM(total_score) FROM cohort_daily_scores "
+    "WHERE day BETWEEN ?1 AND ?2 " + ROLLUP_FILTERS +
+    "GROUP BY day ORDER BY day"
+)
+# Ranked full-text matches joined back to history; a NULL filter matches every row.
+# snippet() column -1 picks whichever column matched best.
+SQL_SEARCH_HISTORY = (
+    "SELECT h.rowid, h.user_id, h.timestamp, h.role, h.mode, h.question_set, h.difficulty, h.question, h.score, "
+    "snippet(history_fts, -1, ?2, ?3, '…', 16) "
+    "FROM history_fts JOIN history h ON h.rowid = history_fts.rowid "
+    "WHERE history_fts MATCH ?1 AND (?4 IS NULL OR h.user_id = ?4) "
+    "AND (?5 IS NULL OR h.score >= ?5) AND (?6 IS NULL OR h.score <= ?6) "
+    "ORDER BY history_fts.rank LIMIT ?7 OFFSET ?8"
+)
+SQL_REBUILD_SEARCH_INDEX = "INSERT INTO history_fts (history_fts) VALUES ('rebuild')"
+SQL_LOAD_LEADERBOARD = "SELECT user_id, total_score, attempts FROM leaderboard"
+SQL_TOP_LEADERBOARD = (
+    "SELECT user_id, total_score, attempts FROM leaderboard "
+    "ORDER BY CAST(total_score AS REAL) / attempts DESC LIMIT ?"
+)
+SQL_UPSERT_LEADERBOARD = (
+    "INSERT INTO leaderboard (user_id, total_score, attempts) VALUES (?, ?, ?) "
+    "ON CONFLICT (user_id) DO UPDATE SET "
+    "total_score = total_score + excluded.total_score, attempts = attempts + excluded.attempts"
+)
+
+# Time spent acquiring the write lock; the load test reads these to measure contention
+LOCK_WAIT = metrics.histogram(
+    "interview_db_lock_wait_seconds", "Time for BEGIN IMMEDIATE to get the write lock",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+)
+LOCK_ERRORS = metrics.counter("interview_db_lock_errors_total", "Write transactions that gave up on a locked database")
+
+_pool = queue.LifoQueue()
+_pool_lock = threading.Lock()
+
+# Leaderboard totals are kept in SQLite. Each replica has its own database file,
+# so with a shared store (storage.shared()) the totals also go to two store
+# hashes, user_id -> total score and user_id -> attempts (HINCRBY), and the
+# ranking is read from those. The top-N is cached in the store as one hash with a
+# field per limit; adding a score clears it with a single DEL.
+LEADERBOARD_TOTALS_KEY = "leaderboard:total"
+LEADERBOARD_ATTEMPTS_KEY = "leaderboard:attempts"
+LEADERBOARD_CACHE_KEY = "leaderboard:top"
+
+
+def _connect():
+    # Autocommit mode: transactions are opened explicitly by transaction()
+    conn = sqlite3.connect(
+        DB_PATH,
+        timeout=5,
+        isolation_level=None,
+        check_same_thread=False,
+        cached_statements=STATEMENT_CACHE_SIZE
+    )
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def configure(path):
+    # Point the pool at another database file (benchmarks, load tests)
+    global DB_PATH
+    with _pool_lock:
+        DB_PATH = path
+        close_all()
+
+
+def close_all():
+    while True:
+        try:
+            conn, _ = _pool.get_nowait()
+        except queue.Empty:
+            return
+        conn.close()
+
+
+@contextmanager
+def connection():
+    try:
+        conn, path = _pool.get_nowait()
+        if path != DB_PATH:
+            conn.close()
+            conn, path = _connect(), DB_PATH
+    except queue.Empty:
+        conn, path = _connect(), DB_PATH
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        if _pool.qsize() < POOL_SIZE and path == DB_PATH:
+            _pool.put((conn, path))
+        else:
+            conn.close()
+
+
+@contextmanager
+def transaction():
+    # BEGIN IMMEDIATE takes the write lock up front, so concurrent writers wait on
+    # busy_timeout instead of failing with "database is locked" on lock upgrade
+    with connection() as conn:
+        start = time.perf_counter()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError as e:
+            if "locked" in str(e) or "busy" in str(e):
+                LOCK_ERRORS.inc()
+            raise
+        LOCK_WAIT.observe(time.perf_counter() - start)
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+
+_schema_ready = set()
+
+
+def ensure_schema():
+    # Run migrations once per process (per database file) instead of on every rerun
+    if DB_PATH in _schema_ready:
+        return
+    with _pool_lock:
+        if DB_PATH not in _schema_ready:
+            init_db()
+            _schema_ready.add(DB_PATH)
+
+
+def init_db():
+    with transaction() as conn:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for number in range(version, len(MIGRATIONS)):
+            for statement in MIGRATIONS[number]:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {number + 1}")
+
+
+def _history_entry(row):
+    return {
+        "timestamp": row[1],
+        "role": row[2],
+        "mode": row[3],
+        "question_set": row[4],
+        "question": row[5],
+        "answer": row[6],
+        "feedback": row[7],
+        "score": row[8]
+    }
+
+
+def _cursor(row):
+    # Keyset position of a row: (timestamp, rowid) breaks ties within the same second
+    return (row[1], row[0])
+
+
+@metrics.timed("interview_function_seconds", function="load_history")
+def load_history(user_id):
+    with connection() as conn:
+        rows = conn.execute(SQL_LOAD_HISTORY, (user_id,)).fetchall()
+    return [_history_entry(row) for row in rows]
+
+
+@metrics.timed("interview_function_seconds", function="load_history_page")
+def load_history_page(user_id, before=None, limit=HISTORY_PAGE_SIZE):
+    # Newest-first page of history strictly older than the `before` cursor.
+    # Returns (entries, cursor); cursor is None when there is nothing older.
+    with connection() as conn:
+        if before is None:
+            rows = conn.execute(SQL_HISTORY_FIRST_PAGE, (user_id, limit + 1)).fetchall()
+        else:
+            rows = conn.execute(SQL_HISTORY_PAGE_BEFORE, (user_id, before[0], before[1], limit + 1)).fetchall()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return [_history_entry(row) for row in rows], (_cursor(rows[-1]) if more else None)
+
+
+@metrics.timed("interview_function_seconds", function="load_history_since")
+def load_history_since(user_id, since):
+    # Everything at or newer than the `since` cursor, newest first
+    with connection() as conn:
+        rows = conn.execute(SQL_HISTORY_SINCE, (user_id, since[0], since[1])).fetchall()
+    return [_history_entry(row) for row in rows]
+
+
+def find_answer(user_id, question, answer):
+    # Latest recorded grading of this exact answer, or None
+    with connection() as conn:
+        row = conn.execute(SQL_FIND_ANSWER, (user_id, question, answer)).fetchone()
+    return _history_entry(row) if row else None
+
+
+def history_row(user_id, entry):
+    return (
+        user_id,
+        entry["timestamp"],
+        entry["role"],
+        entry["mode"],
+        entry["question_set"],
+        entry.get("difficulty"),
+        entry["question"],
+        entry["answer"],
+        entry["feedback"],
+        entry["score"]
+    )
+
+
+def save_history(user_id, entry):
+    with transaction() as conn:
+        conn.execute(SQL_SAVE_HISTORY, history_row(user_id, entry))
+
+
+@metrics.timed("interview_function_seconds", function="load_leaderboard")
+def load_leaderboard():
+    with connection() as conn:
+        rows = conn.execute(SQL_LOAD_LEADERBOARD).fetchall()
+    return [{"user_id": row[0], "total_score": row[1], "attempts": row[2]} for row in rows]
+
+
+def _local_top_leaderboard(limit):
+    with connection() as conn:
+        rows = conn.execute(SQL_TOP_LEADERBOARD, (limit,)).fetchall()
+    return [{"user_id": row[0], "total_score": row[1], "attempts": row[2]} for row in rows]
+
+
+def _shared_top_leaderboard(limit):
+    pipe = storage.get_store().pipeline()
+    pipe.hgetall(LEADERBOARD_TOTALS_KEY)
+    pipe.hgetall(LEADERBOARD_ATTEMPTS_KEY)
+    totals, attempts = (storage.as_dict(reply) for reply in pipe.execute())
+    leaderboard = [
+        {"user_id": user_id.decode("utf-8"), "total_score": int(total), "attempts": int(attempts[user_id])}
+        for user_id, total in totals.items() if int(attempts.get(user_id, 0)) > 0
+    ]
+    leaderboard.sort(key=lambda row: row["total_score"] / row["attempts"], reverse=True)
+    return leaderboard[:limit]
+
+
+@metrics.timed("interview_function_seconds", function="load_top_leaderboard")
+def load_top_leaderboard(limit=5):
+    # Best averages first; served from a short-lived cache since this runs on every rerun
+    store = storage.get_store()
+    try:
+        cached = store.hget(LEADERBOARD_CACHE_KEY, limit)
+        if cached is not None:
+            return json.loads(cached)
+        leaderboard = _shared_top_leaderboard(limit) if storage.shared() else _local_top_leaderboard(limit)
+    except storage.UNAVAILABLE:
+        # Store down: this replica's own totals, uncached
+        storage.ERRORS.inc(operation="leaderboard_read")
+        return _local_top_leaderboard(limit)
+    pipe = store.pipeline(transaction=True)
+    pipe.hset(LEADERBOARD_CACHE_KEY, {limit: json.dumps(leaderboard)})
+    pipe.expire(LEADERBOARD_CACHE_KEY, LEADERBOARD_CACHE_TTL)
+    try:
+        pipe.execute()
+    except storage.UNAVAILABLE:
+        storage.ERRORS.inc(operation="leaderboard_write")
+    return leaderboard
+
+
+def invalidate_leaderboard_cache():
+    # If the store is down the cached top-N just lives out its TTL
+    try:
+        storage.get_store().delete(LEADERBOARD_CACHE_KEY)
+    except storage.UNAVAILABLE:
+        storage.ERRORS.inc(operation="leaderboard_invalidate")
+
+
+def add_shared_scores(scores):
+    # {user_id: (total, attempts)} onto the shared totals, clearing the cached
+    # top-N, in one round trip; raises storage.UNAVAILABLE if the store is down
+    pipe = storage.get_store().pipeline(transaction=True)
+    for user_id, (total, attempts) in scores.items():
+        pipe.hincrby(LEADERBOARD_TOTALS_KEY, user_id, total)
+        pipe.hincrby(LEADERBOARD_ATTEMPTS_KEY, user_id, attempts)
+    pipe.delete(LEADERBOARD_CACHE_KEY)
+    pipe.execute()
+
+
+def save_leaderboard(user_id, score):
+    # Single atomic upsert: no read-then-write window for concurrent submits to lose updates
+    with transaction() as conn:
+        conn.execute(SQL_UPSERT_LEADERBOARD, (user_id, score, 1))
+    if not storage.shared():
+        invalidate_leaderboard_cache()
+        return
+    try:
+        add_shared_scores({user_id: (score, 1)})
+    except storage.UNAVAILABLE:
+        storage.ERRORS.inc(operation="leaderboard_add")
+
+
+def _trend(sql, params):
+    with connection() as conn:
+        rows = conn.execute(sql, params).fetchall()
+    return [{"day": day, "attempts": attempts, "average": total / attempts} for day, attempts, total in rows]
+
+
+@metrics.timed("interview_function_seconds", function="load_score_trend")
+def load_score_trend(user_id, since="0000-00-00", until="9999-99-99", role=None, mode=None, question_set=None, difficulty=None):
+    # Per-day attempts and average score for one user, days as "YYYY-MM-DD"
+    return _trend(SQL_USER_TREND, (since, until, role, mode, question_set, difficulty, user_id))
+
+
+@metrics.timed("interview_function_seconds", function="load_cohort_trend")
+def load_cohort_trend(since="0000-00-00", until="9999-99-99", role=None, mode=None, question_set=None, difficulty=None):
+    # The same series across every user, for comparing someone against the cohort
+    return _trend(SQL_COHORT_TREND, (since, until, role, mode, question_set, difficulty))
+
+
+def search_query(text, columns=None):
+    # Free text -> FTS5 query: every word must match (a trailing * matches a prefix),
+    # optionally only in some of SEARCH_COLUMNS. Quoting each word means input like
+    # "C++" or an unbalanced quote can't be a syntax error.
+    terms = re.findall(r"\w+\*?", text)
+    if not terms:
+        return None
+    query = " ".join(f'"{term.rstrip("*")}"' + ("*" if term.endswith("*") else "") for term in terms)
+    if columns:
+        query = "{" + " ".join(column for column in columns if column in SEARCH_COLUMNS) + "} : (" + query + ")"
+    return query
+
+
+@metrics.timed("interview_function_seconds", function="search_history")
+def search_history(text, user_id=None, min_score=None, max_score=None, columns=None,
+                   offset=0, limit=SEARCH_PAGE_SIZE, highlight=("**", "**")):
+    # Best matches first across every user (or one). Returns (results, next offset);
+    # next offset is None on the last page. Each result's "snippet" has the matched
+    # terms wrapped in the `highlight` markers.
+    query = search_query(text, columns)
+    if query is None:
+        return [], None
+    with connection() as conn:
+        rows = conn.execute(SQL_SEARCH_HISTORY, (query, highlight[0], highlight[1], user_id,
+                                                 min_score, max_score, limit + 1, offset)).fetchall()
+    more = len(rows) > limit
+    results = [
+        {"rowid": row[0], "user_id": row[1], "timestamp": row[2], "role": row[3], "mode": row[4],
+         "question_set": row[5], "difficulty": row[6], "question": row[7], "score": row[8], "snippet": row[9]}
+        for row in rows[:limit]
+    ]
+    return results, (offset + limit if more else None)
+
+
+def rebuild_search_index():
+    with transaction() as conn:
+        conn.execute(SQL_REBUILD_SEARCH_INDEX)
@@ -0,0 +1,86 @@
+import os
+import itertools
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait as wait_futures
+
+import bot
+import write_buffer
+
+# Shared worker pool; each session keeps its own EvaluationQueue of job IDs
+MAX_WORKERS = int(os.getenv("EVALUATION_WORKERS", "8"))
+# Upper bound on concurrent LLM calls when an exam is graded in one batch. Each
+# answer costs two sequential calls (grade, then digest), all drawn from the
+# process-wide token bucket (inference.RATE / BURST): an exam takes about two
+# round trips only while the bucket holds 2 x questions tokens, and is paced at
+# INFERENCE_RATE after that (benchmarks/bench_exam.py shows both).
+EXAM_CONCURRENCY = int(os.getenv("EXAM_CONCURRENCY", "10"))
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="evaluate")
+_job_ids = itertools.count(1)
+
+
+def _evaluate(question, answer, mode, feedback=None, score=None, entry=None):
+    # Grade (unless the feedback is already known, e.g. it was streamed), record
+    # the history entry if given, then digest on the same worker so the digest is
+    # ready by the time the summary runs. Recording here rather than on the next
+    # rerun means a candidate who closes the tab still gets the answer recorded.
+    if feedback is None:
+        feedback, score = bot.evaluate_answer(question, answer, mode)
+    if entry is not None:
+        write_buffer.record_answer(entry["user_id"], {**entry, "feedback": feedback, "score": score})
+    return feedback, score, bot.digest_answer(question, answer, feedback, score)
+
+
+class EvaluationQueue:
+    def __init__(self):
+        # job_id -> (question index, future, history entry), in submission order
+        self.jobs = {}
+
+    def submit(self, index, question, answer, mode, context=None, feedback=None, score=None):
+        # context: the history entry (without feedback/score) for the worker to record once graded
+        job_id = next(_job_ids)
+        future = _executor.submit(_evaluate, question, answer, mode, feedback, score, context)
+        self.jobs[job_id] = (index, future, context)
+        return job_id
+
+    def pending(self):
+        return sum(1 for _, future, _ in self.jobs.values() if not future.done())
+
+    def collect(self, wait=False, timeout=None):
+        # Return (job_id, index, feedback, score, digest, context, error) for every finished
+        # job and forget it; with wait=True block until all outstanding jobs finish
+        if wait and self.jobs:
+            wait_futures([future for _, future, _ in self.jobs.values()], timeout=timeout)
+        results = []
+        for job_id, (index, future, context) in list(self.jobs.items()):
+            if not future.done():
+                continue
+            del self.jobs[job_id]
+            try:
+                feedback, score, digest = future.result()
+                results.append((job_id, index, feedback, score, digest, context, None))
+            except Exception as e:
+                results.append((job_id, index, f"Failed to evaluate answer: {e}", 0, None, context, e))
+        return results
+
+
+def evaluate_all(questions, answers, mode, max_workers=EXAM_CONCURRENCY, digest=False):
+    # Grade every answer of an exam in parallel through a bounded pool. Each
+    # evaluate_answer call still backs off on rate limits on its own worker, so a
+    # throttled call only delays its own slot. Results come back in question order,
+    # as (feedback, score, error) or, with digest=True, (feedback, score, digest, error);
+    # error is None unless grading failed.
+    results = [None] * len(answers)
+    if not answers:
+        return results
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(answers))), thread_name_prefix="exam") as pool:
+        futures = {
+            pool.submit(_evaluate if digest else bot.evaluate_answer, question, answer, mode): i
+            for i, (question, answer) in enumerate(zip(questions, answers))
+        }
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                results[i] = future.result() + (None,)
+            except Exception as e:
+                results[i] = (f"Failed to evaluate answer: {e}", 0) + ((None,) if digest else ()) + (e,)
+    return results
@@ -0,0 +1,95 @@
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import metrics
+
+# Summary exports, rendered in memory on a small background pool. Results are
+# cached per (session, format, content hash), so downloading again is free and
+# a changed summary renders afresh. Kept free of Streamlit so load tests can use it.
+WORKERS = 2
+MAX_ENTRIES = 64
+
+_executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="export")
+_futures = OrderedDict()
+_lock = threading.Lock()
+
+
+def normalize_text(text):
+    if not text:
+        return text
+    # Preserve Unicode instead of stripping non-ASCII
+    return unicodedata.normalize('NFKD', text)
+
+
+@metrics.timed("interview_function_seconds", function="render_pdf")
+def render_pdf(user_id, role, mode, summary):
+    # Imported here so fpdf only loads when someone actually exports
+    from fpdf import FPDF
+
+    user_id = normalize_text(user_id)
+    role = normalize_text(role)
+    mode = normalize_text(mode)
+    summary = normalize_text(summary)
+
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", "B", 16)
+    pdf.cell(0, 10, "Interview Summary Report", ln=True, align="C")
+    pdf.set_font("Arial", "", 12)
+    pdf.cell(0, 10, f"User: {user_id} | Role: {role} | Mode: {mode}", ln=True, align="C")
+    pdf.cell(0, 10, f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", ln=True, align="C")
+    pdf.ln(10)
+
+    pdf.set_font("Arial", "B", 14)
+    lines = summary.split("\n")
+    for line in lines:
+        if line.strip().startswith("- "):
+            pdf.set_font("Arial", "", 12)
+            pdf.multi_cell(0, 10, f"  - {line.strip()[2:]}")
+        elif line.strip():
+            pdf.set_font("Arial", "B", 14)
+            pdf.cell(0, 10, line.strip(), ln=True)
+            pdf.ln(2)
+
+    data = pdf.output(dest="S")
+    # fpdf 1.7 returns a latin-1 str, fpdf2 a bytearray
+    return data.encode("latin-1") if isinstance(data, str) else bytes(data)
+
+
+def render_txt(summary):
+    return (summary or "").encode("utf-8")
+
+
+def _export_key(session_id, kind, *parts):
+    digest = hashlib.sha256("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+    return (session_id, kind, digest)
+
+
+def _submit(key, fn, *args):
+    with _lock:
+        future = _futures.get(key)
+        if future is not None and not (future.done() and future.exception() is not None):
+            _futures.move_to_end(key)
+            return future
+        future = _executor.submit(fn, *args)
+        _futures[key] = future
+        while len(_futures) > MAX_ENTRIES:
+            _futures.popitem(last=False)
+    return future
+
+
+def export_pdf(session_id, user_id, role, mode, summary):
+    # Future of the PDF bytes; the same session and summary always get the same future
+    return _submit(_export_key(session_id, "pdf", user_id, role, mode, summary), render_pdf, user_id, role, mode, summary)
+
+
+def export_txt(session_id, summary):
+    return _submit(_export_key(session_id, "txt", summary), render_txt, summary)
+
+
+def file_name(user_id, extension):
+    return f"summary_{user_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
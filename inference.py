@@ -0,0 +1,390 @@
+import os
+import time
+import random
+import asyncio
+import threading
+from concurrent.futures import Future
+
+import metrics
+from llm_cache import ResponseCache, make_key
+
+# Failures where the upstream never answered: OSError covers socket errors,
+# timeouts and requests' exceptions; httpx's transport errors aren't OSErrors
+TRANSPORT_ERRORS = (OSError,)
+try:
+    import httpx
+    TRANSPORT_ERRORS += (httpx.TransportError,)
+except ImportError:
+    pass
+
+# Single gateway for every chat completion. All sessions share one token-bucket
+# rate limiter and one circuit breaker, retries use jittered exponential backoff
+# under an overall deadline, and when the upstream is unavailable the last cached
+# answer (even an expired one) is served instead of failing.
+RATE = float(os.getenv("INFERENCE_RATE", "5"))  # sustained requests per second, process-wide
+# Sized so a full 10-question exam (grade + digest per answer, 20 calls) starts at once;
+# beyond the burst, and with other sessions drawing on the same bucket, calls are paced at RATE
+BURST = int(os.getenv("INFERENCE_BURST", "20"))
+DEADLINE = float(os.getenv("INFERENCE_DEADLINE", "60"))  # seconds per call, retries included
+MAX_ATTEMPTS = int(os.getenv("INFERENCE_MAX_ATTEMPTS", "4"))
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 16.0
+BREAKER_THRESHOLD = int(os.getenv("INFERENCE_BREAKER_THRESHOLD", "5"))  # consecutive failures
+BREAKER_RESET = float(os.getenv("INFERENCE_BREAKER_RESET", "30"))  # seconds before a probe is let through
+
+RETRYABLE = ("rate_limit", "transient")
+
+
+class InferenceError(RuntimeError):
+    pass
+
+
+class InferenceUnavailable(InferenceError):
+    # Retries or the deadline ran out; the caller should degrade gracefully
+    pass
+
+
+class CircuitOpenError(InferenceUnavailable):
+    pass
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline):
+        # Block until a token is free; give up (False) if that would pass the deadline
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    def __init__(self, threshold, reset_timeout):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self._probing:
+                # One request probes the upstream; everyone else keeps degrading
+                self._probing = True
+                return True
+            return False
+
+    def release(self):
+        # The call let through never reached the upstream: free the probe slot
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+
+class SingleFlight:
+    # Coalesces identical in-flight requests: the first caller for a key (the
+    # leader) does the work, everyone arriving while it runs shares its result
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def join(self, key):
+        # Returns (future, is_leader)
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            return future, True
+
+    def lead(self, key, future, fn):
+        try:
+            result = fn()
+        except BaseException as e:
+            self._forget(key)
+            future.set_exception(e)
+            raise
+        self._forget(key)
+        future.set_result(result)
+        return result
+
+    def do(self, key, fn):
+        future, leader = self.join(key)
+        if leader:
+            return self.lead(key, future, fn)
+        _count("coalesced")
+        return future.result()
+
+    def _forget(self, key):
+        with self._lock:
+            self._calls.pop(key, None)
+
+
+# Response cache shared by all sessions; set to None to disable, or swap in
+# any object with get(key, allow_expired=False)/set(key, value)
+cache = ResponseCache()
+bucket = TokenBucket(RATE, BURST)
+breaker = CircuitBreaker(BREAKER_THRESHOLD, BREAKER_RESET)
+flight = SingleFlight()
+
+# requests, successes, failures, retries, rate_limited, throttled, breaker_rejections,
+# degraded_served, cache_hits, cache_misses, coalesced
+_events = metrics.counter("interview_llm_events_total", "Inference gateway events by kind")
+
+
+def _count(name, value=1):
+    _events.inc(value, event=name)
+
+
+def stats():
+    return {**_events.by_label("event"), "breaker_state": breaker.state}
+
+
+def _classify(e):
+    response = getattr(e, "response", None)
+    status = getattr(response, "status_code", None)
+    if status == 429:
+        return "rate_limit"
+    if status in (401, 403):
+        return "auth"
+    if status is not None and status >= 500:
+        return "transient"
+    if status is None and isinstance(e, TRANSPORT_ERRORS):
+        return "transient"
+    message = str(e).lower()
+    if "rate limit" in message or "too many requests" in message:
+        return "rate_limit"
+    if "unauthorized" in message:
+        return "auth"
+    if "timed out" in message or "timeout" in message or "temporarily unavailable" in message or "overloaded" in message:
+        return "transient"
+    return "fatal"
+
+
+def _backoff(attempt, e):
+    # Full jitter, so throttled sessions don't retry in lockstep; honour Retry-After when given
+    headers = getattr(getattr(e, "response", None), "headers", None) or {}
+    try:
+        retry_after = float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        retry_after = 0.0
+    return max(retry_after, random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt)))
+
+
+def _call(fn, timeout, model):
+    deadline = time.monotonic() + timeout
+    for attempt in range(MAX_ATTEMPTS):
+        if not breaker.allow():
+            _count("breaker_rejections")
+            raise CircuitOpenError("Inference circuit is open after repeated upstream failures")
+        if not bucket.acquire(deadline):
+            breaker.release()
+            _count("throttled")
+            raise InferenceUnavailable("Inference rate limit left no capacity before the deadline")
+        _count("requests")
+        start = time.monotonic()
+        try:
+            result = fn()
+        except Exception as e:
+            _count("failures")
+            kind = _classify(e)
+            metrics.LLM_REQUEST_SECONDS.observe(time.monotonic() - start, model=model, outcome=kind)
+            if kind == "fatal":
+                # Only a response proves the upstream is up; anything else says nothing about it
+                if getattr(getattr(e, "response", None), "status_code", None) is not None:
+                    breaker.record_success()
+                else:
+                    breaker.release()
+                raise
+            breaker.record_failure()
+            if kind == "rate_limit":
+                _count("rate_limited")
+            if kind not in RETRYABLE:
+                raise
+            delay = _backoff(attempt, e)
+            if attempt + 1 >= MAX_ATTEMPTS or time.monotonic() + delay > deadline:
+                raise InferenceUnavailable(f"Inference failed after {attempt + 1} attempts: {e}") from e
+            _count("retries")
+            time.sleep(delay)
+            continue
+        except BaseException:
+            # Interrupted (KeyboardInterrupt, GeneratorExit, ...) before any outcome
+            breaker.release()
+            raise
+        _count("successes")
+        metrics.LLM_REQUEST_SECONDS.observe(time.monotonic() - start, model=model, outcome="success")
+        breaker.record_success()
+        return result
+    raise InferenceUnavailable("Inference failed: no attempts left")
+
+
+def _stale(key):
+    # Degraded mode: any cached answer for this exact request, expired or not
+    if cache is None:
+        return None
+    content = cache.get(key, allow_expired=True)
+    if content is not None:
+        _count("degraded_served")
+    return content
+
+
+def _cached(key, validate=None):
+    if cache is None:
+        return None
+    content = cache.get(key)
+    if content is not None and (validate is None or validate(content)):
+        _count("cache_hits")
+        return content
+    _count("cache_misses")
+    return None
+
+
+def _fetch(client, messages, model, max_tokens, temperature, key, validate, timeout):
+    def request():
+        response = client.chat_completion(
+            messages=messages,
+            model=model,
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+        return response.choices[0].message.content.strip()
+
+    try:
+        content = _call(request, timeout, model)
+    except InferenceUnavailable:
+        content = _stale(key)
+        if content is None:
+            raise
+        return content
+    # Only keep responses that are usable, so a malformed one isn't served forever
+    if cache is not None and (validate is None or validate(content)):
+        cache.set(key, content)
+    return content
+
+
+def complete(client, messages, model, max_tokens=512, temperature=1, use_cache=True, validate=None, timeout=DEADLINE,
+             refresh=False):
+    # refresh=True skips the cache lookup (the caller has already seen the cached
+    # answer) but still joins an identical request in flight and stores the result
+    key = make_key(model, messages, max_tokens, temperature)
+    if not use_cache:
+        # Callers opting out of the cache want their own sample, so they aren't coalesced either
+        return _fetch(client, messages, model, max_tokens, temperature, key, validate, timeout)
+    content = None if refresh else _cached(key, validate)
+    if content is not None:
+        return content
+    return flight.do(key, lambda: _fetch(client, messages, model, max_tokens, temperature, key, validate, timeout))
+
+
+async def acomplete(client, messages, model, max_tokens=512, temperature=1, use_cache=True, validate=None, timeout=DEADLINE,
+                    refresh=False):
+    # asyncio flavour of complete(). Followers await the leader's future without
+    # holding a thread; the leader's blocking call runs in the default executor.
+    key = make_key(model, messages, max_tokens, temperature)
+    loop = asyncio.get_running_loop()
+    fetch = lambda: _fetch(client, messages, model, max_tokens, temperature, key, validate, timeout)
+    if not use_cache:
+        return await loop.run_in_executor(None, fetch)
+    content = None if refresh else _cached(key, validate)
+    if content is not None:
+        return content
+    future, leader = flight.join(key)
+    if leader:
+        # lead() re-raises for its own caller; here the error reaches us through the future
+        loop.run_in_executor(None, _lead_quietly, key, future, fetch)
+    else:
+        _count("coalesced")
+    return await asyncio.wrap_future(future)
+
+
+def _lead_quietly(key, future, fn):
+    try:
+        flight.lead(key, future, fn)
+    except BaseException:
+        pass
+
+
+def stream(client, messages, model, max_tokens=512, temperature=1, use_cache=True, timeout=DEADLINE):
+    # Yields text chunks as they arrive. Retries only happen before the first
+    # chunk; a failure mid-stream raises InferenceError.
+    key = make_key(model, messages, max_tokens, temperature)
+    if use_cache:
+        content = _cached(key)
+        if content is not None:
+            yield content
+            return
+
+    def request():
+        chunks = iter(client.chat_completion(
+            messages=messages,
+            model=model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True
+        ))
+        # Pull the first chunk here so connection and rate-limit errors surface inside the retry loop
+        return next(chunks, None), chunks
+
+    try:
+        first, chunks = _call(request, timeout, model)
+    except InferenceUnavailable:
+        content = _stale(key)
+        if content is None:
+            raise
+        yield content
+        return
+
+    parts = []
+    try:
+        for chunk in _chain(first, chunks):
+            if not chunk.choices:
+                continue
+            token = chunk.choices[0].delta.content
+            if token:
+                parts.append(token)
+                yield token
+    except Exception as e:
+        breaker.record_failure()
+        raise InferenceError(f"Stream interrupted: {e}") from e
+    if cache is not None:
+        cache.set(key, "".join(parts).strip())
+
+
+def _chain(first, chunks):
+    if first is not None:
+        yield first
+    yield from chunks
@@ -0,0 +1,243 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import storage
+
+# Two-tier cache for chat completion text: an in-memory LRU in front of an
+# on-disk SQLite table. Entries are keyed on a hash of the full request.
+DEFAULT_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.db")
+DEFAULT_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+DEFAULT_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "512"))
+DEFAULT_DISK_ENTRIES = int(os.getenv("LLM_CACHE_DISK_ENTRIES", "20000"))
+DEFAULT_STALE_GRACE = int(os.getenv("LLM_CACHE_STALE_GRACE", str(24 * 3600)))
+
+
+def make_key(model, messages, max_tokens, temperature):
+    payload = json.dumps(
+        {"model": model, "messages": messages, "max_tokens": max_tokens, "temperature": temperature},
+        sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, path=DEFAULT_PATH, ttl=DEFAULT_TTL, max_memory_entries=DEFAULT_MEMORY_ENTRIES,
+                 max_disk_entries=DEFAULT_DISK_ENTRIES):
+        self.ttl = ttl
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.misses = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self._memory = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self._path = path
+        self._conn = None
+        self._disk_count = 0
+
+    def _disk(self):
+        # The SQLite tier is opened on first use (under self._lock) to keep imports cheap
+        if self._conn is None and self._path:
+            self._conn = sqlite3.connect(self._path, check_same_thread=False)
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT,
+                expires_at REAL,
+                accessed_at REAL
+            )""")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)")
+            self._conn.commit()
+            self._disk_count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return self._conn
+
+    def get(self, key, allow_expired=False):
+        # allow_expired returns entries past their TTL too (degraded mode); those
+        # lookups are not counted as hits or misses
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if allow_expired:
+                    return value
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    self.memory_hits += 1
+                    return value
+                # Expired entries stay until LRU eviction so degraded mode can still use them
+            if self._disk() is not None:
+                row = self._conn.execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+                if row and allow_expired:
+                    return row[0]
+                if row and row[1] > now:
+                    self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                    self._conn.commit()
+                    self._remember(key, row[0], row[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return row[0]
+            if not allow_expired:
+                self.misses += 1
+            return None
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._remember(key, value, expires_at)
+            if self._disk() is not None:
+                cur = self._conn.execute(
+                    "INSERT OR IGNORE INTO responses (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, value, expires_at, now)
+                )
+                if cur.rowcount:
+                    self._disk_count += 1
+                else:
+                    self._conn.execute(
+                        "UPDATE responses SET value = ?, expires_at = ?, accessed_at = ? WHERE key = ?",
+                        (value, expires_at, now, key)
+                    )
+                if self._disk_count > self.max_disk_entries:
+                    self._evict_disk(now)
+                self._conn.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._memory.pop(key, None)
+            if self._disk() is not None:
+                cur = self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._disk_count -= cur.rowcount
+                self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._disk() is not None:
+                self._conn.execute("DELETE FROM responses")
+                self._conn.commit()
+                self._disk_count = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "memory_entries": len(self._memory),
+                "disk_entries": self._disk_count
+            }
+
+    def _remember(self, key, value, expires_at):
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self, now):
+        # Expired rows go first, then the least recently used ones down to the limit
+        cur = self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        self._disk_count -= cur.rowcount
+        excess = self._disk_count - self.max_disk_entries
+        if excess > 0:
+            cur = self._conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed_at LIMIT ?)",
+                (excess,)
+            )
+            self._disk_count -= cur.rowcount
+
+
+class SharedResponseCache(ResponseCache):
+    # Same interface, but the second tier is the shared store (storage.py) instead
+    # of a local SQLite file, so an answer cached by one replica serves all of
+    # them. Entries stay in the store stale_grace seconds past their TTL for
+    # degraded mode (get(..., allow_expired=True)).
+    def __init__(self, store, ttl=DEFAULT_TTL, max_memory_entries=DEFAULT_MEMORY_ENTRIES,
+                 stale_grace=DEFAULT_STALE_GRACE, prefix="llm:"):
+        super().__init__(path=None, ttl=ttl, max_memory_entries=max_memory_entries)
+        self.store = store
+        self.stale_grace = stale_grace
+        self.prefix = prefix
+        self.shared_hits = 0
+
+    def get(self, key, allow_expired=False):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and allow_expired:
+                return entry[0]
+            if entry is not None and entry[1] > now:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                self.memory_hits += 1
+                return entry[0]
+        # The round trip happens outside the lock; a store outage reads as a miss
+        try:
+            raw = self.store.get(self.prefix + key)
+        except storage.UNAVAILABLE:
+            storage.ERRORS.inc(operation="llm_cache_read")
+            raw = None
+        if raw is not None:
+            expires_at, value = json.loads(raw)
+            if allow_expired:
+                return value
+            if expires_at > now:
+                with self._lock:
+                    self._remember(key, value, expires_at)
+                    self.hits += 1
+                    self.shared_hits += 1
+                return value
+        if not allow_expired:
+            with self._lock:
+                self.misses += 1
+        return None
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._remember(key, value, expires_at)
+        try:
+            self.store.set(self.prefix + key, json.dumps([expires_at, value], ensure_ascii=False), ttl=ttl + self.stale_grace)
+        except storage.UNAVAILABLE:
+            storage.ERRORS.inc(operation="llm_cache_write")
+
+    def delete(self, key):
+        with self._lock:
+            self._memory.pop(key, None)
+        try:
+            self.store.delete(self.prefix + key)
+        except storage.UNAVAILABLE:
+            storage.ERRORS.inc(operation="llm_cache_delete")
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        try:
+            batch = []
+            for key in self.store.scan_iter(self.prefix + "*"):
+                batch.append(key)
+                if len(batch) == 500:
+                    self.store.delete(*batch)
+                    batch = []
+            if batch:
+                self.store.delete(*batch)
+        except storage.UNAVAILABLE:
+            storage.ERRORS.inc(operation="llm_cache_clear")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_hits": self.memory_hits,
+                "shared_hits": self.shared_hits,
+                "memory_entries": len(self._memory)
+            }
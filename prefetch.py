@@ -0,0 +1,106 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import bot
+
+# Background question generation, keyed by the sidebar settings tuple.
+# The executor and cache are process-wide so every session shares them.
+# A prefetch only goes to the executor once the settings have stayed put for
+# SETTLE_DELAY seconds, and a session has at most one outstanding: changing a
+# setting cancels the previous guess unless a worker has already started it.
+MAX_WORKERS = 4
+MAX_ENTRIES = 32
+MAX_SESSIONS = 1024
+SETTLE_DELAY = 1.0
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="prefetch")
+_futures = OrderedDict()  # settings key -> Future of (questions, warning)
+_sessions = OrderedDict()  # session id -> settings key it last prefetched
+_lock = threading.Lock()
+
+
+def settings_key(role, domain, mode, question_set, difficulty, num_questions, user_id=""):
+    # user_id is part of the key because bank questions are de-duplicated against the user's history
+    return (role.strip(), (domain or "").strip(), mode, question_set, difficulty, num_questions, user_id or "")
+
+
+def _generate(key):
+    role, domain, mode, question_set, difficulty, num_questions, user_id = key
+    return bot.get_questions(role, domain, mode, num_questions, question_set, difficulty, user_id)
+
+
+def _run(key, future):
+    # The future stays pending, so cancel() still works, through the settle delay
+    # and the executor queue; it only starts running once a worker picks it up
+    if not future.set_running_or_notify_cancel():
+        return
+    try:
+        result = _generate(key)
+    except BaseException as e:
+        future.set_exception(e)
+    else:
+        future.set_result(result)
+
+
+def _submit(key, future):
+    if not future.cancelled():
+        _executor.submit(_run, key, future)
+
+
+def _drop(key):
+    # Caller holds _lock; a guess already running is left to finish and stays cached
+    future = _futures.get(key)
+    if future is not None and future.cancel():
+        del _futures[key]
+
+
+def prefetch_questions(role, domain, mode, question_set, difficulty, num_questions, user_id="", session=None):
+    # Invalid settings would only raise in the worker, so don't bother submitting them
+    if not role or not role.strip() or len(role) > 100 or (domain and len(domain) > 100):
+        return None
+    key = settings_key(role, domain, mode, question_set, difficulty, num_questions, user_id)
+    with _lock:
+        if session is not None:
+            previous = _sessions.pop(session, None)
+            if previous is not None and previous != key:
+                _drop(previous)
+            _sessions[session] = key
+            while len(_sessions) > MAX_SESSIONS:
+                _sessions.popitem(last=False)
+        future = _futures.get(key)
+        if future is not None:
+            _futures.move_to_end(key)
+            return future
+        future = Future()
+        _futures[key] = future
+        while len(_futures) > MAX_ENTRIES:
+            _, stale = _futures.popitem(last=False)
+            stale.cancel()
+    timer = threading.Timer(SETTLE_DELAY, _submit, (key, future))
+    timer.daemon = True
+    timer.start()
+    return future
+
+
+def take_questions(role, domain, mode, question_set, difficulty, num_questions, user_id="", timeout=None, session=None):
+    # Consume the prefetched (questions, warning) so the next interview gets fresh
+    # questions. Only a guess a worker has already started is worth waiting for:
+    # one still settling or queued behind other sessions' prefetches is cancelled
+    # and generated here instead, which is never slower.
+    key = settings_key(role, domain, mode, question_set, difficulty, num_questions, user_id)
+    with _lock:
+        future = _futures.pop(key, None)
+        if session is not None:
+            _sessions.pop(session, None)
+    if future is None or future.cancel() or future.cancelled():
+        return _generate(key)
+    return future.result(timeout=timeout)
+
+
+def clear():
+    with _lock:
+        for future in _futures.values():
+            future.cancel()
+        _futures.clear()
+        _sessions.clear()
@@ -0,0 +1,102 @@
+import re
+import argparse
+import itertools
+from datetime import datetime
+
+import db
+
+# Pre-generated questions stored per (role, domain, mode, question_set, difficulty).
+# Interviews sample from here first; the live LLM is only the fallback.
+ROLES = ["Software Engineer", "Product Manager", "Data Analyst"]
+MODES = ["Technical Interview", "Behavioral Interview"]
+QUESTION_SETS = ["Standard", "FAANG-style", "STAR-based"]
+DIFFICULTIES = ["Beginner", "Medium", "Advanced"]
+
+SQL_SAMPLE = (
+    "SELECT question FROM question_bank AS qb "
+    "WHERE role = ? AND domain = ? AND mode = ? AND question_set = ? AND difficulty = ? "
+    "AND NOT EXISTS ("
+    # History keeps the numbered form ("3. text"), so compare on the suffix
+    "SELECT 1 FROM history AS h WHERE h.user_id = ? "
+    "AND substr(h.question, length(h.question) - length(qb.question) + 1) = qb.question"
+    ") ORDER BY random() LIMIT ?"
+)
+SQL_ADD = (
+    "INSERT OR IGNORE INTO question_bank (role, domain, mode, question_set, difficulty, question, created_at) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+SQL_COUNT = (
+    "SELECT COUNT(*) FROM question_bank "
+    "WHERE role = ? AND domain = ? AND mode = ? AND question_set = ? AND difficulty = ?"
+)
+
+_NUMBERING = re.compile(r"^\s*\d+\s*[.)]\s*")
+
+
+def _settings(role, domain, mode, question_set, difficulty):
+    return (role.strip(), (domain or "").strip(), mode, question_set, difficulty)
+
+
+def sample_questions(role, domain, mode, question_set, difficulty, num_questions, user_id=None):
+    # Up to num_questions random bank questions the user hasn't answered before, numbered for display
+    db.ensure_schema()
+    with db.connection() as conn:
+        rows = conn.execute(
+            SQL_SAMPLE, (*_settings(role, domain, mode, question_set, difficulty), user_id or "", num_questions)
+        ).fetchall()
+    return [f"{i + 1}. {row[0]}" for i, row in enumerate(rows)]
+
+
+def add_questions(role, domain, mode, question_set, difficulty, questions):
+    settings = _settings(role, domain, mode, question_set, difficulty)
+    created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    db.ensure_schema()
+    rows = [(*settings, text, created_at) for text in (_NUMBERING.sub("", q).strip() for q in questions) if text]
+    with db.transaction() as conn:
+        before = conn.total_changes
+        conn.executemany(SQL_ADD, rows)
+        return conn.total_changes - before
+
+
+def count_questions(role, domain, mode, question_set, difficulty):
+    db.ensure_schema()
+    with db.connection() as conn:
+        return conn.execute(SQL_COUNT, _settings(role, domain, mode, question_set, difficulty)).fetchone()[0]
+
+
+def pregenerate(roles=ROLES, domains=("",), modes=MODES, question_sets=QUESTION_SETS, difficulties=DIFFICULTIES,
+                per_call=10, target=30, max_calls=6):
+    # Fill every settings combination up to `target` questions with the generate_questions prompt
+    import bot
+
+    if bot.get_client() is None:
+        raise RuntimeError(bot.get_client_error() or "No inference client available")
+    for settings in itertools.product(roles, domains, modes, question_sets, difficulties):
+        role, domain, mode, question_set, difficulty = settings
+        calls = 0
+        while count_questions(*settings) < target and calls < max_calls:
+            calls += 1
+            questions, warning = bot.generate_questions(role, domain, mode, per_call, question_set, difficulty, use_cache=False)
+            if warning is not None:
+                break
+            add_questions(*settings, questions)
+        print(f"{count_questions(*settings):4d}  {' / '.join(s or '-' for s in settings)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate interview questions into the question bank")
+    parser.add_argument("--roles", nargs="+", default=ROLES)
+    parser.add_argument("--domains", nargs="+", default=[""], help="use '' for no domain")
+    parser.add_argument("--modes", nargs="+", default=MODES)
+    parser.add_argument("--question-sets", nargs="+", default=QUESTION_SETS)
+    parser.add_argument("--difficulties", nargs="+", default=DIFFICULTIES)
+    parser.add_argument("--per-call", type=int, default=10, help="questions requested per LLM call")
+    parser.add_argument("--target", type=int, default=30, help="questions to keep per settings combination")
+    parser.add_argument("--max-calls", type=int, default=6, help="LLM calls allowed per settings combination")
+    args = parser.parse_args()
+    pregenerate(args.roles, args.domains, args.modes, args.question_sets, args.difficulties,
+                args.per_call, args.target, args.max_calls)
+
+
+if __name__ == "__main__":
+    main()
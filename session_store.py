@@ -0,0 +1,407 @@
+import os
+import json
+import time
+import uuid
+import zlib
+import hashlib
+import threading
+from collections import OrderedDict
+
+import db
+import storage
+
+# Out-of-band storage for the large per-session texts (questions, answers,
+# feedback, digests). Session state only keeps a TextSeq of row IDs; the texts
+# live in SQLite and are read through a bounded, process-wide LRU when a rerun
+# renders them. Texts of sessions idle for SESSION_IDLE_SECONDS are dropped from
+# the LRU, and rows untouched for SESSION_TEXT_RETENTION seconds are deleted.
+#
+# Writes are queued, not written one by one: row IDs come from a block reserved
+# per process (ID_BLOCK at a time), and every queued text from every session is
+# written in one transaction at the start of the next rerun (touch), in the
+# snapshot save's transaction, or once SESSION_TEXT_WRITE_BATCH texts are queued.
+TEXT_CACHE_ENTRIES = int(os.getenv("SESSION_TEXT_CACHE_ENTRIES", "2048"))
+TEXT_WRITE_BATCH = int(os.getenv("SESSION_TEXT_WRITE_BATCH", "256"))
+SESSION_IDLE_SECONDS = float(os.getenv("SESSION_IDLE_SECONDS", "600"))
+SESSION_TEXT_RETENTION = float(os.getenv("SESSION_TEXT_RETENTION", str(7 * 24 * 3600)))
+EVICT_INTERVAL = 60  # seconds between idle sweeps
+ID_BLOCK = 1024
+
+SQL_UPSERT_TEXT = (
+    "INSERT INTO session_texts (id, session_id, body, updated_at) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT (id) DO UPDATE SET body = excluded.body, updated_at = excluded.updated_at"
+)
+SQL_TEXT_ID_BLOCK = "SELECT last_id FROM id_blocks WHERE name = 'session_texts'"
+SQL_MAX_TEXT_ID = "SELECT COALESCE(MAX(id), 0) FROM session_texts"
+SQL_SAVE_TEXT_ID_BLOCK = (
+    "INSERT INTO id_blocks (name, last_id) VALUES ('session_texts', ?) "
+    "ON CONFLICT (name) DO UPDATE SET last_id = excluded.last_id"
+)
+SQL_DELETE_SESSION = "DELETE FROM session_texts WHERE session_id = ?"
+SQL_PURGE_TEXTS = "DELETE FROM session_texts WHERE updated_at < ?"
+
+# Saved sessions, per user: a small compressed header (settings, scores, progress,
+# summary) plus one compressed row per text item. Saves only rewrite items whose
+# hash changed and bump the snapshot version, all in one transaction.
+SNAPSHOT_KINDS = ("questions", "responses", "feedbacks", "digests")
+COMPRESSION_LEVEL = 6
+SQL_SNAPSHOT_HASHES = "SELECT kind, position, hash FROM session_snapshot_items WHERE user_id = ?"
+SQL_UPSERT_SNAPSHOT_ITEM = (
+    "INSERT INTO session_snapshot_items (user_id, kind, position, hash, body) VALUES (?, ?, ?, ?, ?) "
+    "ON CONFLICT (user_id, kind, position) DO UPDATE SET hash = excluded.hash, body = excluded.body"
+)
+SQL_TRIM_SNAPSHOT_ITEMS = "DELETE FROM session_snapshot_items WHERE user_id = ? AND kind = ? AND position >= ?"
+SQL_UPSERT_SNAPSHOT = (
+    "INSERT INTO session_snapshots (user_id, version, state, saved_at) VALUES (?, 1, ?, ?) "
+    "ON CONFLICT (user_id) DO UPDATE SET version = version + 1, state = excluded.state, saved_at = excluded.saved_at"
+)
+# Read back inside the save's transaction (RETURNING needs SQLite 3.35+)
+SQL_SNAPSHOT_VERSION = "SELECT version FROM session_snapshots WHERE user_id = ?"
+SQL_LOAD_SNAPSHOT = "SELECT version, state FROM session_snapshots WHERE user_id = ?"
+SQL_LOAD_SNAPSHOT_ITEMS = "SELECT kind, position, body FROM session_snapshot_items WHERE user_id = ?"
+# With a shared store (storage.shared()) snapshots live there instead, so a user can
+# resume on any replica: one hash per user (header plus a "kind:position" field per
+# item) and a version counter, both written in one MULTI/EXEC. Without WATCH there
+# is no safe read-then-diff, so shared saves rewrite every item; it is still a
+# single round trip.
+SNAPSHOT_KEY = "snapshot:{}"
+SNAPSHOT_VERSION_KEY = "snapshot:{}:version"
+
+_cache = OrderedDict()  # row id -> (session_id, text)
+_cache_lock = threading.Lock()
+_pending = {}  # row id -> (session_id, text, updated_at) queued for the next flush; guarded by _cache_lock
+_flush_lock = threading.Lock()  # keeps flushes in order, so an older text never overwrites a newer one
+_id_blocks = {}  # database path -> [next row id, last row id of the reserved block]
+_id_lock = threading.Lock()
+_last_seen = {}  # session_id -> monotonic time of its last rerun
+_last_sweep = time.monotonic()
+
+
+def new_session_id():
+    return uuid.uuid4().hex
+
+
+def _trim():
+    # Caller holds _cache_lock
+    while len(_cache) > TEXT_CACHE_ENTRIES:
+        _cache.popitem(last=False)
+
+
+def _cached(row_id):
+    with _cache_lock:
+        entry = _cache.get(row_id)
+        if entry is None:
+            # Queued texts are served from the queue even after the LRU drops them
+            entry = _pending.get(row_id)
+            return None if entry is None else entry[1]
+        _cache.move_to_end(row_id)
+        return entry[1]
+
+
+def _new_row_id():
+    with _id_lock:
+        block = _id_blocks.get(db.DB_PATH)
+        if block is None or block[0] > block[1]:
+            db.ensure_schema()
+            with db.transaction() as conn:
+                row = conn.execute(SQL_TEXT_ID_BLOCK).fetchone()
+                start = (row[0] if row else conn.execute(SQL_MAX_TEXT_ID).fetchone()[0]) + 1
+                conn.execute(SQL_SAVE_TEXT_ID_BLOCK, (start + ID_BLOCK - 1,))
+            block = _id_blocks[db.DB_PATH] = [start, start + ID_BLOCK - 1]
+        row_id = block[0]
+        block[0] += 1
+        return row_id
+
+
+def _queue(row_id, session_id, text):
+    with _cache_lock:
+        _cache[row_id] = (session_id, text)
+        _cache.move_to_end(row_id)
+        _trim()
+        _pending[row_id] = (session_id, text, time.time())
+        full = len(_pending) >= TEXT_WRITE_BATCH
+    if full:
+        flush_texts()
+
+
+def _take_pending():
+    with _cache_lock:
+        return dict(_pending)
+
+
+def _write_pending(conn, batch):
+    conn.executemany(SQL_UPSERT_TEXT, [(row_id, sid, text, at) for row_id, (sid, text, at) in batch.items()])
+
+
+def _written(batch):
+    # Only after the commit, so a reader never finds a text in neither place;
+    # entries re-queued during the write stay for the next flush
+    with _cache_lock:
+        for row_id, entry in batch.items():
+            if _pending.get(row_id) is entry:
+                del _pending[row_id]
+
+
+def flush_texts():
+    # Write every queued text, from every session, in one transaction
+    with _flush_lock:
+        batch = _take_pending()
+        if not batch:
+            return 0
+        db.ensure_schema()
+        with db.transaction() as conn:
+            _write_pending(conn, batch)
+        _written(batch)
+    return len(batch)
+
+
+def _load(session_id, row_ids):
+    # {row id: text} for rows missing from the LRU, fetched in one query
+    db.ensure_schema()
+    placeholders = ",".join("?" * len(row_ids))
+    with db.connection() as conn:
+        rows = conn.execute(f"SELECT id, body FROM session_texts WHERE id IN ({placeholders})", row_ids).fetchall()
+    texts = dict(rows)
+    with _cache_lock:
+        for row_id, text in texts.items():
+            _cache[row_id] = (session_id, text)
+        _trim()
+    return texts
+
+
+class TextSeq:
+    # List-like sequence of texts (or None) that only holds row IDs in memory.
+    # Supports what the app does with its lists: append, indexing (also negative
+    # and slices), item assignment, len(), truthiness and iteration.
+    __slots__ = ("session_id", "_ids")
+
+    def __init__(self, session_id, values=()):
+        self.session_id = session_id
+        self._ids = []
+        self.extend(values)
+
+    def append(self, text):
+        self._ids.append(self._store(None, text))
+
+    def extend(self, values):
+        self._ids.extend([self._store(None, text) for text in values])
+
+    def _store(self, row_id, text):
+        # Queued for flush_texts(); no write lock is taken here
+        if text is None:
+            return None
+        if row_id is None:
+            row_id = _new_row_id()
+        _queue(row_id, self.session_id, text)
+        return row_id
+
+    def __setitem__(self, index, text):
+        self._ids[index] = self._store(self._ids[index], text)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._texts(self._ids[index])
+        row_id = self._ids[index]
+        if row_id is None:
+            return None
+        text = _cached(row_id)
+        return text if text is not None else self._texts([row_id])[0]
+
+    def _texts(self, row_ids):
+        texts = {}
+        missing = []
+        for row_id in row_ids:
+            if row_id is None:
+                continue
+            text = _cached(row_id)
+            if text is None:
+                missing.append(row_id)
+            else:
+                texts[row_id] = text
+        if missing:
+            texts.update(_load(self.session_id, missing))
+        return [texts.get(row_id) if row_id is not None else None for row_id in row_ids]
+
+    def __iter__(self):
+        return iter(self._texts(self._ids))
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __repr__(self):
+        return f"TextSeq({self.session_id!r}, {len(self._ids)} texts)"
+
+
+def touch(session_id):
+    # Called once per rerun: writes the texts queued since the last one, and runs
+    # the periodic idle sweep
+    global _last_sweep
+    flush_texts()
+    now = time.monotonic()
+    _last_seen[session_id] = now
+    if now - _last_sweep >= EVICT_INTERVAL:
+        _last_sweep = now
+        evict_idle(now)
+
+
+def evict_idle(now=None, idle_seconds=SESSION_IDLE_SECONDS):
+    # Drop cached texts of idle sessions; they reload from SQLite if the user comes back
+    now = time.monotonic() if now is None else now
+    idle = {sid for sid, seen in list(_last_seen.items()) if now - seen >= idle_seconds}
+    if not idle:
+        return 0
+    with _cache_lock:
+        stale = [row_id for row_id, (sid, _) in _cache.items() if sid in idle]
+        for row_id in stale:
+            del _cache[row_id]
+    for sid in idle:
+        _last_seen.pop(sid, None)
+    purge_expired()
+    return len(stale)
+
+
+def purge_expired(retention=SESSION_TEXT_RETENTION):
+    db.ensure_schema()
+    with db.transaction() as conn:
+        return conn.execute(SQL_PURGE_TEXTS, (time.time() - retention,)).rowcount
+
+
+def discard(session_id):
+    # The session is gone for good (New Interview): forget its texts everywhere
+    _last_seen.pop(session_id, None)
+    with _flush_lock:
+        with _cache_lock:
+            for row_id in [row_id for row_id, (sid, _) in _cache.items() if sid == session_id]:
+                del _cache[row_id]
+            for row_id in [row_id for row_id, (sid, _, _) in _pending.items() if sid == session_id]:
+                del _pending[row_id]
+        db.ensure_schema()
+        with db.transaction() as conn:
+            conn.execute(SQL_DELETE_SESSION, (session_id,))
+
+
+def cache_stats():
+    with _cache_lock:
+        return {"entries": len(_cache), "sessions": len(_last_seen)}
+
+
+def _pack(value):
+    return zlib.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"), COMPRESSION_LEVEL)
+
+
+def _unpack(blob):
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+def save_snapshot(user_id, state, texts):
+    # state: small JSON-able fields; texts: {kind: sequence of str/None}.
+    # Returns (version, items written).
+    texts = {kind: list(values) for kind, values in texts.items()}
+    header = _pack({**state, "lengths": {kind: len(values) for kind, values in texts.items()}})
+    if storage.shared():
+        return _save_shared(user_id, header, texts)
+    items = {}
+    for kind, values in texts.items():
+        for position, value in enumerate(values):
+            encoded = json.dumps(value, ensure_ascii=False)
+            items[(kind, position)] = (hashlib.sha1(encoded.encode("utf-8")).hexdigest(), value)
+    db.ensure_schema()
+    # Queued session texts ride along in the same transaction
+    with _flush_lock, db.transaction() as conn:
+        batch = _take_pending()
+        _write_pending(conn, batch)
+        saved = {(kind, position): digest for kind, position, digest in conn.execute(SQL_SNAPSHOT_HASHES, (user_id,))}
+        changed = [
+            (user_id, kind, position, digest, _pack(value))
+            for (kind, position), (digest, value) in items.items()
+            if saved.get((kind, position)) != digest
+        ]
+        conn.executemany(SQL_UPSERT_SNAPSHOT_ITEM, changed)
+        for kind, values in texts.items():
+            conn.execute(SQL_TRIM_SNAPSHOT_ITEMS, (user_id, kind, len(values)))
+        conn.execute(SQL_UPSERT_SNAPSHOT, (user_id, header, time.time()))
+        version = conn.execute(SQL_SNAPSHOT_VERSION, (user_id,)).fetchone()[0]
+    _written(batch)
+    return version, len(changed)
+
+
+def _save_shared(user_id, header, texts):
+    fields = {
+        f"{kind}:{position}": _pack(value)
+        for kind, values in texts.items() for position, value in enumerate(values)
+    }
+    key = SNAPSHOT_KEY.format(user_id)
+    pipe = storage.get_store().pipeline(transaction=True)
+    pipe.delete(key)
+    pipe.hset(key, {**fields, "state": header, "saved_at": time.time()})
+    pipe.incr(SNAPSHOT_VERSION_KEY.format(user_id))
+    return pipe.execute()[-1], len(fields)
+
+
+def load_snapshot(user_id):
+    # (state, {kind: list}) for the user's latest snapshot, or None
+    if not storage.shared():
+        return _load_local(user_id) or _import_legacy(user_id)
+    snapshot = _load_shared(user_id)
+    if snapshot is None:
+        # Saved on this replica before the shared store was switched on: move it over
+        snapshot = _load_local(user_id)
+        if snapshot is None:
+            return _import_legacy(user_id)
+        state, texts = snapshot
+        state["version"], _ = save_snapshot(user_id, {k: v for k, v in state.items() if k != "version"}, texts)
+    return snapshot
+
+
+def _load_local(user_id):
+    db.ensure_schema()
+    with db.connection() as conn:
+        # One read transaction so the header and items come from the same save
+        conn.execute("BEGIN")
+        row = conn.execute(SQL_LOAD_SNAPSHOT, (user_id,)).fetchone()
+        rows = conn.execute(SQL_LOAD_SNAPSHOT_ITEMS, (user_id,)).fetchall() if row else []
+        conn.execute("COMMIT")
+    return _snapshot(row[0], row[1], rows) if row else None
+
+
+def _load_shared(user_id):
+    # Header and items in one transaction, so they come from the same save
+    pipe = storage.get_store().pipeline(transaction=True)
+    pipe.get(SNAPSHOT_VERSION_KEY.format(user_id))
+    pipe.hgetall(SNAPSHOT_KEY.format(user_id))
+    version, fields = pipe.execute()
+    fields = storage.as_dict(fields)
+    if b"state" not in fields:
+        return None
+    rows = []
+    for field, body in fields.items():
+        kind, _, position = field.decode("utf-8").partition(":")
+        if position.isdigit():
+            rows.append((kind, int(position), body))
+    return _snapshot(int(version), fields[b"state"], rows)
+
+
+def _snapshot(version, header, rows):
+    # (state, texts) from a packed header and (kind, position, packed body) rows
+    state = _unpack(header)
+    state["version"] = version
+    lengths = state.pop("lengths", {})
+    texts = {kind: [None] * lengths.get(kind, 0) for kind in SNAPSHOT_KINDS}
+    for kind, position, body in rows:
+        if kind in texts and position < len(texts[kind]):
+            texts[kind][position] = _unpack(body)
+    return state, texts
+
+
+def _import_legacy(user_id):
+    # Sessions saved by older versions as session_<user_id>.json: move them into the table
+    path = f"session_{user_id}.json"
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    texts = {kind: data.get(kind) or [] for kind in SNAPSHOT_KINDS}
+    state = {key: value for key, value in data.items() if key not in SNAPSHOT_KINDS}
+    save_snapshot(user_id, state, texts)
+    os.remove(path)
+    return load_snapshot(user_id)
@@ -0,0 +1,485 @@
+import os
+import time
+import queue
+import socket
+import fnmatch
+import threading
+import socketserver
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import metrics
+
+# Key-value storage for state that every replica must see: saved sessions, the
+# LLM response cache and the leaderboard top-N. STORAGE_URL picks the backend:
+#
+#   (unset) or memory://      - embedded, in this process; a single replica
+#   redis://host:port/db      - a Redis-protocol server shared by all replicas
+#   fake://                   - an in-process Redis-protocol server, for tests
+#                               and benchmarks; exercises the real client
+#
+# All backends take the same commands (a Redis subset, values as bytes). The
+# network client pools connections, and pipeline() sends a batch of commands in
+# one round trip, optionally as a MULTI/EXEC transaction.
+POOL_SIZE = int(os.getenv("STORAGE_POOL_SIZE", "8"))
+SOCKET_TIMEOUT = float(os.getenv("STORAGE_TIMEOUT", "5"))
+
+
+class StorageError(Exception):
+    # An error reply from the server (bad command, wrong type, ...)
+    pass
+
+
+# Raised by any store call when the server is down, times out or replies with an
+# error. Caches in front of SQLite or the LLM catch these and carry on without
+# the store (fail open), counting each skipped call here.
+UNAVAILABLE = (OSError, StorageError)
+ERRORS = metrics.counter("interview_storage_errors_total", "Shared store calls that failed and were skipped, by operation")
+
+
+def as_dict(reply):
+    return dict(zip(reply[::2], reply[1::2]))
+
+
+def _bytes(value):
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, str):
+        return value.encode("utf-8")
+    if isinstance(value, float):
+        return repr(value).encode("ascii")
+    return str(value).encode("ascii")
+
+
+class Commands:
+    # The command methods, shared by stores and pipelines; each subclass decides
+    # what execute_command does (run it now, send it, or queue it)
+    def ping(self):
+        return self.execute_command("PING")
+
+    def get(self, key):
+        return self.execute_command("GET", key)
+
+    def set(self, key, value, ttl=None):
+        # ttl in seconds (float ok)
+        if ttl is None:
+            return self.execute_command("SET", key, value)
+        return self.execute_command("SET", key, value, "PX", int(ttl * 1000))
+
+    def delete(self, *keys):
+        return self.execute_command("DEL", *keys)
+
+    def mget(self, keys):
+        return self.execute_command("MGET", *keys) if keys else []
+
+    def mset(self, mapping):
+        args = [item for pair in mapping.items() for item in pair]
+        return self.execute_command("MSET", *args) if args else "OK"
+
+    def incr(self, key, amount=1):
+        return self.execute_command("INCRBY", key, amount)
+
+    def expire(self, key, ttl):
+        return self.execute_command("PEXPIRE", key, int(ttl * 1000))
+
+    def hget(self, key, field):
+        return self.execute_command("HGET", key, field)
+
+    def hset(self, key, mapping):
+        args = [item for pair in mapping.items() for item in pair]
+        return self.execute_command("HSET", key, *args) if args else 0
+
+    def hdel(self, key, *fields):
+        return self.execute_command("HDEL", key, *fields) if fields else 0
+
+    def hgetall(self, key):
+        # A dict; inside a pipeline the reply stays the flat [field, value, ...] list (see as_dict)
+        reply = self.execute_command("HGETALL", key)
+        return reply if reply is self else as_dict(reply)
+
+    def hincrby(self, key, field, amount=1):
+        return self.execute_command("HINCRBY", key, field, amount)
+
+    def scan_iter(self, match, count=500):
+        # Keys matching a glob pattern, a batch per round trip (not for pipelines)
+        cursor = b"0"
+        while True:
+            cursor, keys = self.execute_command("SCAN", cursor, "MATCH", match, "COUNT", count)
+            yield from keys
+            if cursor == b"0":
+                return
+
+    def dbsize(self):
+        return self.execute_command("DBSIZE")
+
+    def flushdb(self):
+        return self.execute_command("FLUSHDB")
+
+
+class Pipeline(Commands):
+    # Queues commands; execute() runs them in one round trip and returns the replies
+    def __init__(self, store, transaction):
+        self.store = store
+        self.transaction = transaction
+        self.commands = []
+
+    def execute_command(self, *args):
+        self.commands.append(tuple(_bytes(arg) for arg in args))
+        return self
+
+    def execute(self):
+        commands, self.commands = self.commands, []
+        if not commands:
+            return []
+        return self.store.execute_many(commands, self.transaction)
+
+
+class MemoryStore(Commands):
+    # Embedded backend: dicts in this process. Also the data behind FakeRedisServer.
+    def __init__(self):
+        self._data = {}
+        self._expires = {}  # key -> monotonic deadline
+        self._lock = threading.RLock()
+
+    def pipeline(self, transaction=False):
+        return Pipeline(self, transaction)
+
+    def execute_command(self, *args):
+        return self.execute_many([tuple(_bytes(arg) for arg in args)])[0]
+
+    def execute_many(self, commands, transaction=False):
+        results = self.run_batch(commands)
+        errors = [r for r in results if isinstance(r, StorageError)]
+        if errors:
+            raise errors[0]
+        return results
+
+    def run_batch(self, commands):
+        # One lock for the batch, so a pipeline is always atomic here. Like EXEC,
+        # every command runs and errors are returned in place.
+        results = []
+        with self._lock:
+            for command in commands:
+                try:
+                    results.append(self._run(command))
+                except StorageError as e:
+                    results.append(e)
+        return results
+
+    def _live(self, key):
+        deadline = self._expires.get(key)
+        if deadline is not None and deadline <= time.monotonic():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return self._data.get(key)
+
+    def _hash(self, key, create=False):
+        value = self._live(key)
+        if value is None:
+            if not create:
+                return {}
+            value = self._data[key] = {}
+        if not isinstance(value, dict):
+            raise StorageError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def _string(self, key):
+        value = self._live(key)
+        if isinstance(value, dict):
+            raise StorageError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def _run(self, command):
+        name, args = command[0].upper(), command[1:]
+        if name == b"PING":
+            return "PONG"
+        if name == b"GET":
+            return self._string(args[0])
+        if name == b"SET":
+            self._data[args[0]] = args[1]
+            self._expires.pop(args[0], None)
+            if len(args) == 4 and args[2].upper() == b"PX":
+                self._expires[args[0]] = time.monotonic() + int(args[3]) / 1000
+            return "OK"
+        if name == b"DEL":
+            removed = 0
+            for key in args:
+                if self._live(key) is not None:
+                    del self._data[key]
+                    self._expires.pop(key, None)
+                    removed += 1
+            return removed
+        if name == b"MGET":
+            values = [self._live(key) for key in args]
+            return [None if isinstance(value, dict) else value for value in values]
+        if name == b"MSET":
+            for key, value in zip(args[::2], args[1::2]):
+                self._data[key] = value
+                self._expires.pop(key, None)
+            return "OK"
+        if name == b"INCRBY":
+            value = int(self._string(args[0]) or 0) + int(args[1])
+            self._data[args[0]] = str(value).encode("ascii")
+            return value
+        if name == b"PEXPIRE":
+            if self._live(args[0]) is None:
+                return 0
+            self._expires[args[0]] = time.monotonic() + int(args[1]) / 1000
+            return 1
+        if name == b"HGET":
+            return self._hash(args[0]).get(args[1])
+        if name == b"HSET":
+            fields = self._hash(args[0], create=True)
+            added = sum(1 for field in args[1::2] if field not in fields)
+            fields.update(zip(args[1::2], args[2::2]))
+            return added
+        if name == b"HDEL":
+            fields = self._hash(args[0])
+            removed = sum(1 for field in args[1:] if fields.pop(field, None) is not None)
+            if not fields:
+                self._data.pop(args[0], None)
+            return removed
+        if name == b"HGETALL":
+            return [item for pair in self._hash(args[0]).items() for item in pair]
+        if name == b"HINCRBY":
+            fields = self._hash(args[0], create=True)
+            value = int(fields.get(args[1], 0)) + int(args[2])
+            fields[args[1]] = str(value).encode("ascii")
+            return value
+        if name == b"SCAN":
+            # Everything in one batch; the cursor only matters to a real server
+            pattern = args[args.index(b"MATCH") + 1].decode("utf-8") if b"MATCH" in args else "*"
+            keys = [key for key in list(self._data) if self._live(key) is not None and fnmatch.fnmatchcase(key.decode("utf-8"), pattern)]
+            return [b"0", keys]
+        if name == b"DBSIZE":
+            return sum(1 for key in list(self._data) if self._live(key) is not None)
+        if name == b"FLUSHDB":
+            self._data.clear()
+            self._expires.clear()
+            return "OK"
+        if name == b"SELECT":
+            return "OK"
+        raise StorageError(f"ERR unknown command '{name.decode('ascii', 'replace')}'")
+
+
+def _encode(commands):
+    out = []
+    for command in commands:
+        out.append(b"*%d\r\n" % len(command))
+        for arg in command:
+            out.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(out)
+
+
+def _read_reply(reader):
+    line = reader.readline()
+    if not line:
+        raise ConnectionError("Storage server closed the connection")
+    kind, rest = line[:1], line[1:-2]
+    if kind == b"+":
+        return rest.decode("utf-8")
+    if kind == b"-":
+        return StorageError(rest.decode("utf-8"))
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        size = int(rest)
+        return None if size < 0 else reader.read(size + 2)[:-2]
+    if kind == b"*":
+        size = int(rest)
+        return None if size < 0 else [_read_reply(reader) for _ in range(size)]
+    raise ConnectionError(f"Bad reply from storage server: {line[:40]!r}")
+
+
+class _Connection:
+    def __init__(self, host, port, db, timeout):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile("rb")
+        if db:
+            self.call([(b"SELECT", _bytes(db))])
+
+    def call(self, commands):
+        self.sock.sendall(_encode(commands))
+        return [_read_reply(self.reader) for _ in commands]
+
+    def close(self):
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class RedisStore(Commands):
+    # Redis-protocol client (RESP2) on the standard library, with a connection pool
+    def __init__(self, host="127.0.0.1", port=6379, db=0, pool_size=POOL_SIZE, timeout=SOCKET_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._pool = queue.LifoQueue()
+
+    @contextmanager
+    def _connection(self):
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = _Connection(self.host, self.port, self.db, self.timeout)
+        try:
+            yield conn
+        except BaseException:
+            # The reply stream may be out of step now; never reuse this socket
+            conn.close()
+            raise
+        if self._pool.qsize() < self.pool_size:
+            self._pool.put(conn)
+        else:
+            conn.close()
+
+    def pipeline(self, transaction=False):
+        return Pipeline(self, transaction)
+
+    def execute_command(self, *args):
+        return self.execute_many([tuple(_bytes(arg) for arg in args)])[0]
+
+    def execute_many(self, commands, transaction=False):
+        if transaction:
+            commands = [(b"MULTI",)] + commands + [(b"EXEC",)]
+        with self._connection() as conn:
+            replies = conn.call(commands)
+        if transaction:
+            # MULTI and each queued command reply +OK/+QUEUED; EXEC carries the results
+            queued = [r for r in replies[:-1] if isinstance(r, StorageError)]
+            if queued:
+                raise queued[0]
+            replies = replies[-1]
+            if replies is None:
+                raise StorageError("EXECABORT Transaction discarded")
+        errors = [r for r in replies if isinstance(r, StorageError)]
+        if errors:
+            raise errors[0]
+        return replies
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def _write_reply(value):
+    if isinstance(value, StorageError):
+        return b"-%s\r\n" % str(value).encode("utf-8")
+    if isinstance(value, str):
+        return b"+%s\r\n" % value.encode("utf-8")
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, list):
+        return b"*%d\r\n" % len(value) + b"".join(_write_reply(item) for item in value)
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+class _FakeHandler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        # Small replies to pipelined commands would otherwise wait on delayed ACKs
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def handle(self):
+        store = self.server.store
+        transaction = None  # commands queued since MULTI
+        while True:
+            try:
+                command = _read_reply(self.rfile)
+            except ConnectionError:
+                return
+            if not isinstance(command, list) or not command:
+                self.wfile.write(_write_reply(StorageError("ERR protocol error")))
+                return
+            name = command[0].upper()
+            if name == b"MULTI":
+                transaction = []
+                reply = "OK"
+            elif name == b"EXEC":
+                commands, transaction = transaction or [], None
+                reply = store.run_batch(commands)
+            elif transaction is not None:
+                transaction.append(tuple(command))
+                reply = "QUEUED"
+            else:
+                reply = store.run_batch([tuple(command)])[0]
+            self.wfile.write(_write_reply(reply))
+
+
+class FakeRedisServer:
+    # In-process Redis-protocol server on 127.0.0.1, backed by a MemoryStore.
+    # Several RedisStore clients pointed at it behave like replicas sharing Redis.
+    def __init__(self, port=0):
+        self.server = socketserver.ThreadingTCPServer(("127.0.0.1", port), _FakeHandler, bind_and_activate=False)
+        self.server.daemon_threads = True
+        self.server.allow_reuse_address = True
+        self.server.store = MemoryStore()
+        self._thread = None
+
+    @property
+    def address(self):
+        return self.server.server_address
+
+    @property
+    def url(self):
+        return f"redis://{self.address[0]}:{self.address[1]}/0"
+
+    def start(self):
+        self.server.server_bind()
+        self.server.server_activate()
+        self._thread = threading.Thread(target=self.server.serve_forever, name="fake-redis", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def from_url(url):
+    # A store for STORAGE_URL-style urls (see the top of this module)
+    parsed = urlparse(url or "memory://")
+    if parsed.scheme in ("", "memory"):
+        return MemoryStore()
+    if parsed.scheme == "redis":
+        db = int(parsed.path.strip("/") or 0)
+        return RedisStore(parsed.hostname or "127.0.0.1", parsed.port or 6379, db)
+    if parsed.scheme == "fake":
+        return from_url(FakeRedisServer().start().url)
+    raise ValueError(f"Unsupported STORAGE_URL '{url}'. Use memory://, redis://host:port/db or fake://.")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    # Created on first use, once per process; STORAGE_URL is read then, so a .env
+    # loaded after import still applies
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = from_url(os.getenv("STORAGE_URL", ""))
+    return _store
+
+
+def set_store(store):
+    global _store
+    with _store_lock:
+        _store = store
+
+
+def shared():
+    # True when state lives outside this process, so other replicas see it
+    return not isinstance(get_store(), MemoryStore)
@@ -0,0 +1,163 @@
+import re
+import json
+
+import metrics
+
+# Structured LLM output: prompts ask for JSON, and the parser here accepts what
+# models actually send back: code fences, chatter around the JSON, truncated
+# documents (closed off at the last complete element), or no JSON at all, in
+# which case the plain-text fallbacks below are used.
+PARSES = metrics.counter("interview_parse_total", "Structured output parses by kind and outcome (json, repaired, text, failed)")
+
+_FENCE = re.compile(r"```(?:json)?", re.IGNORECASE)
+_NUMBERING = re.compile(r"^\s*(?:[-*•]|\(?\d+[.):]|Q\d+[.):]?|Question\s+\d+[.):])\s*", re.IGNORECASE)
+# "Score: 7", "score of 7", "score is 7.5", each optionally followed by "/10" or "out of 10"
+_SCORE_LABEL = r"score\W{0,3}(?:(?:of|is|was)\s+)?"
+_SCORE_PATTERNS = (
+    re.compile(_SCORE_LABEL + r"(\d{1,2}(?:\.\d+)?)\s*(?:/|out of)\s*10", re.IGNORECASE),
+    re.compile(r"(\d{1,2}(?:\.\d+)?)\s*(?:/|out of)\s*10"),
+    re.compile(_SCORE_LABEL + r"(\d{1,2}(?:\.\d+)?)\b", re.IGNORECASE),
+)
+
+
+class PartialJSON:
+    # Incremental scanner: feed() chunks as they arrive (O(n) overall), value()
+    # returns the best parse of what has been seen so far, or None
+    def __init__(self):
+        self.buffer = ""
+        self.start = None  # index of the opening { or [
+        self.end = None  # index just past the matching close, once complete
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._commas = []  # (index, open brackets at that point) for every top-level-or-deeper comma
+
+    def feed(self, chunk):
+        offset = len(self.buffer)
+        self.buffer += chunk
+        if self.end is not None:
+            return self
+        for i, ch in enumerate(chunk, offset):
+            if self.start is None:
+                if ch in "{[":
+                    self.start = i
+                    self._stack.append("}" if ch == "{" else "]")
+                continue
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._stack.append("}" if ch == "{" else "]")
+            elif ch in "}]":
+                self._stack.pop()
+                if not self._stack:
+                    self.end = i + 1
+                    break
+            elif ch == ",":
+                self._commas.append((i, tuple(self._stack)))
+        return self
+
+    def complete(self):
+        return self.end is not None
+
+    def value(self, partial_strings=True):
+        # partial_strings=False drops a string cut off mid-way instead of closing it
+        if self.start is None:
+            return None
+        if self.end is not None:
+            try:
+                return json.loads(self.buffer[self.start:self.end])
+            except ValueError:
+                pass
+        # Truncated: close what is open, else cut back to the last complete element
+        text = self.buffer[self.start:self.end]
+        candidates, stacks = [], []
+        if partial_strings or not self._in_string:
+            candidates.append(text + ('"' if self._in_string else ""))
+            stacks.append(tuple(self._stack))
+        for index, stack in reversed(self._commas[-20:]):
+            candidates.append(self.buffer[self.start:index])
+            stacks.append(stack)
+        for candidate, stack in zip(candidates, stacks):
+            candidate = candidate.rstrip().rstrip(",")
+            if candidate.endswith(":"):
+                candidate += " null"
+            try:
+                return json.loads(candidate + "".join(reversed(stack)))
+            except ValueError:
+                continue
+        return None
+
+
+def parse_json(text, partial_strings=True):
+    # Returns (value, outcome) with outcome "json", "repaired" or "failed"
+    parser = PartialJSON().feed(_FENCE.sub("", text or ""))
+    value = parser.value(partial_strings)
+    if value is None:
+        return None, "failed"
+    return value, "json" if parser.complete() else "repaired"
+
+
+def _clean_question(text):
+    return _NUMBERING.sub("", str(text)).strip().strip('"').strip()
+
+
+def parse_questions(text):
+    # Question texts (unnumbered) from {"questions": [...]}, a bare list, or a numbered/bulleted list.
+    # A question cut off by max_tokens is dropped; the caller asks for the missing ones.
+    value, outcome = parse_json(text, partial_strings=False)
+    if isinstance(value, dict):
+        value = value.get("questions")
+    if isinstance(value, list):
+        questions = [_clean_question(q.get("question", "") if isinstance(q, dict) else q) for q in value]
+        questions = [q for q in questions if q]
+        if questions:
+            return questions, outcome
+    questions = [_clean_question(line) for line in (text or "").split("\n") if _NUMBERING.match(line)]
+    questions = [q for q in questions if q and q not in ("{", "}", "[", "]")]
+    return questions, "text" if questions else "failed"
+
+
+def _text_score(text):
+    for pattern in _SCORE_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            return max(0, min(10, round(float(match.group(1)))))
+    return None
+
+
+def _json_score(value):
+    # "score" may come back as 7, 7.5, "7" or "7/10"
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return max(0, min(10, round(value)))
+    value = str(value).strip()
+    return _text_score(value) or _text_score(f"{value}/10")
+
+
+def parse_score(text):
+    # Integer score 0-10 from {"score": n} or the usual plain-text forms; None if absent
+    value, _ = parse_json(text)
+    score = _json_score(value.get("score")) if isinstance(value, dict) else None
+    return score if score is not None else _text_score(text or "")
+
+
+def parse_evaluation(text):
+    # (feedback, score or None, suggestions, outcome) from {"feedback", "score", "suggestions"} or plain text
+    value, outcome = parse_json(text)
+    if isinstance(value, dict) and "feedback" in value:
+        feedback = str(value.get("feedback") or "").strip()
+        suggestions = value.get("suggestions") or ""
+        if isinstance(suggestions, list):
+            suggestions = "; ".join(str(s) for s in suggestions)
+        score = _json_score(value.get("score"))
+        return feedback, score if score is not None else _text_score(feedback), str(suggestions).strip(), outcome
+    score = _text_score(text or "")
+    return (text or "").strip(), score, "", "text" if score is not None else "failed"
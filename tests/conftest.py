@@ -0,0 +1,54 @@
+import os
+import sys
+import socket
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+# Tests import the app modules from the repository root, like the benchmarks do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backends
+import bot
+import db
+import session_store
+import storage
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+@pytest.fixture
+def tmp_db(tmp_path, monkeypatch):
+    # A fresh database and in-process store per test; relative paths (llm_cache.db) land in tmp_path too
+    monkeypatch.chdir(tmp_path)
+    db.configure(str(tmp_path / "interview.db"))
+    db.init_db()
+    storage.set_store(storage.MemoryStore())
+    yield db
+    # Queued session texts belong to this database
+    session_store.flush_texts()
+    db.close_all()
+    storage.set_store(None)
+
+
+@pytest.fixture
+def down_store(tmp_db):
+    # A Redis client pointed at a port nobody listens on
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    store = storage.RedisStore("127.0.0.1", port, timeout=0.5)
+    storage.set_store(store)
+    return store
+
+
+@pytest.fixture
+def app(tmp_db, monkeypatch):
+    # app.py under AppTest, signed in as alice, answering from backends.FakeClient
+    monkeypatch.setattr(bot, "client", bot.client)
+    monkeypatch.setattr(bot, "_client_ready", bot._client_ready)
+    bot.set_client(backends.FakeClient())
+    at = AppTest.from_file(APP, default_timeout=30)
+    at.run()
+    at.sidebar.text_input[0].input("alice").run()
+    return at
@@ -0,0 +1,67 @@
+import time
+from concurrent.futures import wait
+
+import backends
+import bot
+import write_buffer
+
+
+class FailingEvaluations(backends.FakeClient):
+    # Questions work; every grading call fails upstream
+    def chat_completion(self, messages, **kwargs):
+        if messages[-1]["content"].startswith("Evaluate"):
+            raise ValueError("400 Bad Request")
+        return super().chat_completion(messages, **kwargs)
+
+
+def answer(at, index):
+    at.text_area(key=f"answer_{index}").input(f"answer {index}").run()
+    at.button(key=f"submit_{index}").click().run()
+
+
+def test_failed_exam_grades_are_not_recorded(app, tmp_db):
+    app.sidebar.checkbox[0].check().run()
+    app.button(key="start_interview").click().run()
+    bot.set_client(FailingEvaluations())
+    for index in range(len(app.session_state.questions)):
+        answer(app, index)
+    assert not app.exception, app.exception
+    assert app.session_state.step == "summary"
+    assert tmp_db.load_history("alice") == []
+    assert tmp_db.load_leaderboard() == []
+
+
+def test_placeholder_question_warning_is_shown_in_the_interview(app, monkeypatch):
+    monkeypatch.setattr(bot, "client", None)
+    app.button(key="start_interview").click().run()
+    assert app.session_state.step == "interview"
+    assert [w.value for w in app.warning] == ["Using dummy questions due to missing/invalid HF_TOKEN."]
+
+
+class SlowEvaluations(backends.FakeClient):
+    def chat_completion(self, messages, **kwargs):
+        if messages[-1]["content"].startswith("Evaluate"):
+            time.sleep(0.3)
+        return super().chat_completion(messages, **kwargs)
+
+
+def test_answers_are_recorded_even_if_the_tab_closes(app, tmp_db):
+    app.button(key="start_interview").click().run()
+    bot.set_client(SlowEvaluations())
+    answer(app, 0)
+    # No rerun after this one: the candidate closed the tab while it was being graded
+    jobs = app.session_state.evaluations.jobs
+    assert jobs
+    wait([future for _, future, _ in jobs.values()], timeout=10)
+    write_buffer.flush()
+    assert [entry["answer"] for entry in tmp_db.load_history("alice")] == ["answer 0"]
+    assert [row["user_id"] for row in tmp_db.load_leaderboard()] == ["alice"]
+
+
+def test_session_buttons_report_an_unavailable_store(app, down_store):
+    app.button(key="start_interview").click().run()
+    for label in ("Save Session", "Load Session"):
+        next(b for b in app.sidebar.button if b.label == label).click().run()
+        assert not app.exception, app.exception
+        assert [e.value for e in app.error] == ["Session storage is unavailable right now. Please try again later."]
+    assert app.session_state.step == "interview"
@@ -0,0 +1,124 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+import inference
+
+
+class HTTPStatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"{status_code} error")
+        self.response = SimpleNamespace(status_code=status_code, headers={})
+
+
+@pytest.fixture(autouse=True)
+def gateway(monkeypatch):
+    monkeypatch.setattr(inference, "breaker", inference.CircuitBreaker(threshold=1, reset_timeout=0))
+    monkeypatch.setattr(inference, "bucket", inference.TokenBucket(rate=1000, capacity=1000))
+    monkeypatch.setattr(inference, "cache", None)
+    monkeypatch.setattr(inference, "BACKOFF_BASE", 0.001)
+
+
+def test_half_open_probe_is_released_when_the_bucket_gives_up(monkeypatch):
+    inference.breaker.record_failure()
+    assert inference.breaker.state == "open"
+    # No tokens and none coming before the deadline: the probe never reaches the upstream
+    monkeypatch.setattr(inference, "bucket", inference.TokenBucket(rate=0.001, capacity=0))
+    with pytest.raises(inference.InferenceUnavailable):
+        inference._call(lambda: "answer", timeout=0.05, model="m")
+    assert inference.breaker.state == "half_open"
+
+    monkeypatch.setattr(inference, "bucket", inference.TokenBucket(rate=1000, capacity=1000))
+    assert inference._call(lambda: "answer", timeout=1, model="m") == "answer"
+    assert inference.breaker.state == "closed"
+
+
+def test_half_open_probe_is_released_on_interrupt():
+    inference.breaker.record_failure()
+
+    def interrupted():
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        inference._call(interrupted, timeout=1, model="m")
+    assert inference.breaker.allow()
+
+
+@pytest.mark.parametrize("error", [
+    requests.exceptions.ConnectionError("HTTPSConnectionPool: Max retries exceeded (Connection refused)"),
+    ConnectionRefusedError(111, "Connection refused"),
+    TimeoutError("read"),
+    HTTPStatusError(503),
+])
+def test_transport_failures_are_transient(error):
+    assert inference._classify(error) == "transient"
+
+
+def test_client_errors_with_a_response_stay_fatal():
+    assert inference._classify(HTTPStatusError(400)) == "fatal"
+    assert inference._classify(HTTPStatusError(429)) == "rate_limit"
+
+
+def test_network_outage_is_retried_and_counts_against_the_breaker(monkeypatch):
+    monkeypatch.setattr(inference, "breaker", inference.CircuitBreaker(threshold=3, reset_timeout=60))
+    calls = []
+
+    def refused():
+        calls.append(1)
+        raise requests.exceptions.ConnectionError("Max retries exceeded")
+
+    with pytest.raises(inference.InferenceUnavailable):
+        inference._call(refused, timeout=5, model="m")
+    assert len(calls) == 3  # the third failure opens the breaker
+    assert inference.breaker.state == "open"
+
+
+def test_fatal_error_without_a_response_does_not_reset_failures(monkeypatch):
+    monkeypatch.setattr(inference, "breaker", inference.CircuitBreaker(threshold=5, reset_timeout=60))
+    inference.breaker.record_failure()
+
+    def broken():
+        raise ValueError("unexpected payload")
+
+    with pytest.raises(ValueError):
+        inference._call(broken, timeout=1, model="m")
+    assert inference.breaker.failures == 1
+
+
+def test_outage_serves_the_stale_cached_answer(monkeypatch, tmp_path):
+    cache = inference.ResponseCache(path=str(tmp_path / "cache.db"), ttl=0)
+    monkeypatch.setattr(inference, "cache", cache)
+    messages = [{"role": "user", "content": "hi"}]
+    cache.set(inference.make_key("m", messages, 512, 1), "cached answer")
+    time.sleep(0.01)
+
+    class Down:
+        def chat_completion(self, *args, **kwargs):
+            raise requests.exceptions.ConnectionError("Connection refused")
+
+    assert inference.complete(Down(), messages, "m", timeout=2) == "cached answer"
+
+
+def test_refresh_skips_the_cache_but_still_coalesces(monkeypatch, tmp_path):
+    cache = inference.ResponseCache(path=str(tmp_path / "cache.db"))
+    monkeypatch.setattr(inference, "cache", cache)
+    messages = [{"role": "user", "content": "hi"}]
+    key = inference.make_key("m", messages, 512, 1)
+    cache.set(key, "seen answer")
+
+    class Slow:
+        calls = 0
+
+        def chat_completion(self, *args, **kwargs):
+            Slow.calls += 1
+            time.sleep(0.2)
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="fresh answer"))])
+
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        results = list(pool.map(lambda _: inference.complete(Slow(), messages, "m", refresh=True), range(20)))
+    assert results == ["fresh answer"] * 20
+    assert Slow.calls == 1
+    assert cache.get(key) == "fresh answer"
@@ -0,0 +1,74 @@
+import threading
+import time
+
+import pytest
+
+import bot
+import prefetch
+
+SETTINGS = ("Software Engineer", "", "Technical Interview", "Standard", "Medium", 5, "alice")
+GENERATE = prefetch._generate
+
+
+@pytest.fixture(autouse=True)
+def generated(monkeypatch):
+    # Records every generation; each one takes 0.2 s
+    calls = []
+
+    def generate(key):
+        calls.append(key)
+        time.sleep(0.2)
+        return [f"Question for {key[0]}"], None
+
+    monkeypatch.setattr(prefetch, "_generate", generate)
+    monkeypatch.setattr(prefetch, "SETTLE_DELAY", 0)
+    prefetch.clear()
+    yield calls
+    prefetch.clear()
+
+
+def test_started_prefetch_is_awaited(generated):
+    prefetch.prefetch_questions(*SETTINGS, session="s1")
+    time.sleep(0.05)
+    assert prefetch.take_questions(*SETTINGS, session="s1") == (["Question for Software Engineer"], None)
+    assert len(generated) == 1
+
+
+def test_queued_prefetch_is_generated_inline(generated):
+    # Every worker is busy with other sessions' guesses
+    release = threading.Event()
+    blockers = [prefetch._executor.submit(release.wait) for _ in range(prefetch.MAX_WORKERS)]
+    try:
+        prefetch.prefetch_questions(*SETTINGS, session="s1")
+        time.sleep(0.05)
+        start = time.monotonic()
+        assert prefetch.take_questions(*SETTINGS, session="s1") == (["Question for Software Engineer"], None)
+        assert time.monotonic() - start < 0.5
+    finally:
+        release.set()
+    for blocker in blockers:
+        blocker.result()
+    time.sleep(0.05)
+    # The cancelled guess never reached the LLM
+    assert len(generated) == 1
+
+
+def test_changing_settings_cancels_the_previous_prefetch(monkeypatch, generated):
+    monkeypatch.setattr(prefetch, "SETTLE_DELAY", 0.1)
+    first = prefetch.prefetch_questions(*SETTINGS, session="s1")
+    second = prefetch.prefetch_questions("Data Analyst", *SETTINGS[1:], session="s1")
+    assert first.cancelled()
+    assert second.result(timeout=2) == (["Question for Data Analyst"], None)
+    assert [key[0] for key in generated] == ["Data Analyst"]
+
+
+def test_fallback_warning_reaches_the_caller(monkeypatch, tmp_db):
+    # No client and an empty bank: placeholder questions, generated on a prefetch worker
+    monkeypatch.setattr(prefetch, "_generate", GENERATE)
+    monkeypatch.setattr(bot, "client", None)
+    monkeypatch.setattr(bot, "_client_ready", True)
+    prefetch.prefetch_questions(*SETTINGS, session="s1")
+    time.sleep(0.05)
+    questions, warning = prefetch.take_questions(*SETTINGS, session="s1")
+    assert len(questions) == 5 and questions[0].startswith("Dummy question")
+    assert warning == "Using dummy questions due to missing/invalid HF_TOKEN."
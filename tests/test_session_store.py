@@ -0,0 +1,65 @@
+import session_store
+
+
+def test_save_bumps_the_version_and_writes_only_changed_items(tmp_db):
+    texts = {"questions": ["Q1?", "Q2?"], "responses": ["A1"], "feedbacks": [None]}
+    assert session_store.save_snapshot("alice", {"step": "interview"}, texts) == (1, 4)
+    assert session_store.save_snapshot("alice", {"step": "interview"}, texts) == (2, 0)
+    texts["feedbacks"] = ["Good"]
+    assert session_store.save_snapshot("alice", {"step": "interview"}, texts) == (3, 1)
+
+    state, loaded = session_store.load_snapshot("alice")
+    assert state["version"] == 3
+    assert loaded["feedbacks"] == ["Good"]
+
+
+def answer(at, index):
+    at.text_area(key=f"answer_{index}").input(f"answer {index}").run()
+    at.button(key=f"submit_{index}").click().run()
+    assert not at.exception, at.exception
+
+
+def test_load_session_mid_interview_does_not_record_answers_twice(app, tmp_db):
+    app.button(key="start_interview").click().run()
+    answer(app, 0)
+    answer(app, 1)
+    # Grades whatever is still queued, then restores the snapshot taken at the last question boundary
+    next(b for b in app.sidebar.button if b.label == "Load Session").click().run()
+    assert not app.exception, app.exception
+    assert app.session_state.step == "interview"
+    for index in range(app.session_state.current_question_index, len(app.session_state.questions)):
+        answer(app, index)
+    assert app.session_state.step == "summary"
+
+    questions = [entry["question"] for entry in tmp_db.load_history("alice")]
+    assert sorted(questions) == sorted(app.session_state.questions)
+
+
+def test_text_writes_are_queued_and_flushed_in_one_transaction(tmp_db):
+    tmp_db.ensure_schema()
+    before = tmp_db.LOCK_WAIT.summary()[0]
+    texts = session_store.TextSeq("s1", ["Q1?", "Q2?"])
+    texts.append("A1")
+    texts[0] = "Q1, reworded?"
+    texts.append(None)
+    # The first write reserves a block of row ids; nothing else takes the write lock
+    assert tmp_db.LOCK_WAIT.summary()[0] - before == 1
+    assert list(texts) == ["Q1, reworded?", "Q2?", "A1", None]
+
+    assert session_store.flush_texts() == 3
+    assert tmp_db.LOCK_WAIT.summary()[0] - before == 2
+    assert session_store.flush_texts() == 0
+    # Served from SQLite once the LRU has forgotten them
+    session_store.evict_idle(idle_seconds=0)
+    session_store.touch("other")
+    with session_store._cache_lock:
+        session_store._cache.clear()
+    assert list(texts) == ["Q1, reworded?", "Q2?", "A1", None]
+
+
+def test_discarded_session_texts_are_never_written(tmp_db):
+    texts = session_store.TextSeq("s1", ["Q1?"])
+    session_store.discard("s1")
+    assert session_store.flush_texts() == 0
+    with tmp_db.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM session_texts").fetchone()[0] == 0
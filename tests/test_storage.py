@@ -0,0 +1,109 @@
+import pytest
+
+import db
+import llm_cache
+import storage
+import write_buffer
+
+
+def answer(score):
+    return {
+        "timestamp": "2026-01-01T10:00:00", "role": "Software Engineer", "mode": "Technical Interview",
+        "question_set": "Standard", "question": "Q", "answer": "A", "feedback": "", "score": score,
+    }
+
+
+def errors(operation):
+    return storage.ERRORS.by_label("operation").get(operation, 0)
+
+
+def test_leaderboard_is_served_from_sqlite_when_the_store_is_down(down_store):
+    db.save_leaderboard("alice", 8)
+    db.save_leaderboard("bob", 5)
+    assert errors("leaderboard_add") >= 2
+    reads = errors("leaderboard_read")
+
+    assert [row["user_id"] for row in db.load_top_leaderboard()] == ["alice", "bob"]
+    assert errors("leaderboard_read") == reads + 1
+
+    db.invalidate_leaderboard_cache()
+    assert errors("leaderboard_invalidate") >= 1
+
+
+def test_shared_llm_cache_misses_when_the_store_is_down(down_store):
+    cache = llm_cache.SharedResponseCache(down_store)
+    reads = errors("llm_cache_read")
+
+    assert cache.get("key") is None
+    assert cache.get("key", allow_expired=True) is None
+    assert errors("llm_cache_read") == reads + 2
+    assert cache.stats()["misses"] == 1
+
+    # Writes still fill the in-memory tier
+    cache.set("key", "answer")
+    assert cache.get("key") == "answer"
+    cache.delete("key")
+    assert errors("llm_cache_write") >= 1 and errors("llm_cache_delete") >= 1
+
+    cache.set("key", "answer")
+    cache.clear()
+    assert cache.get("key") is None
+    assert errors("llm_cache_clear") >= 1
+
+
+def test_leaderboard_is_cached_in_the_store_until_a_score_is_saved(tmp_db):
+    db.save_leaderboard("alice", 8)
+    assert db.load_top_leaderboard() == [{"user_id": "alice", "total_score": 8, "attempts": 1}]
+    assert storage.get_store().hget(db.LEADERBOARD_CACHE_KEY, 5) is not None
+    db.save_leaderboard("bob", 9)
+    assert storage.get_store().hget(db.LEADERBOARD_CACHE_KEY, 5) is None
+    assert [row["user_id"] for row in db.load_top_leaderboard()] == ["bob", "alice"]
+
+
+@pytest.fixture
+def replicas(tmp_path, tmp_db):
+    # Two app replicas, each with its own SQLite file, sharing one Redis
+    server = storage.FakeRedisServer().start()
+    stores = [storage.RedisStore(*server.address, timeout=2) for _ in range(2)]
+
+    def use(replica):
+        db.configure(str(tmp_path / f"replica{replica}.db"))
+        db.ensure_schema()
+        storage.set_store(stores[replica])
+
+    yield use
+    for store in stores:
+        store.close()
+    server.stop()
+
+
+def test_leaderboard_ranks_every_replicas_scores(replicas):
+    replicas(0)
+    db.save_leaderboard("alice", 6)
+    assert [row["user_id"] for row in db.load_top_leaderboard()] == ["alice"]
+    replicas(1)
+    buffer = write_buffer.WriteBehindBuffer("session_end")
+    buffer.record_answer("bob", answer(9))
+    buffer.flush()
+
+    for replica in (0, 1):
+        replicas(replica)
+        assert db.load_top_leaderboard() == [
+            {"user_id": "bob", "total_score": 9, "attempts": 1},
+            {"user_id": "alice", "total_score": 6, "attempts": 1},
+        ]
+
+
+def test_write_buffer_adds_scores_once_the_store_is_back(replicas, down_store):
+    replicas(0)
+    shared = storage.get_store()
+    buffer = write_buffer.WriteBehindBuffer("session_end")
+    buffer.record_answer("alice", answer(7))
+    storage.set_store(down_store)
+    adds = errors("leaderboard_add")
+    assert buffer.flush() == 1
+    assert errors("leaderboard_add") == adds + 1
+
+    storage.set_store(shared)
+    buffer.flush()
+    assert db.load_top_leaderboard() == [{"user_id": "alice", "total_score": 7, "attempts": 1}]
@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+import structured
+
+
+def test_partial_json_streamed_in_chunks():
+    text = '{"feedback": "Good", "score": 8}'
+    parser = structured.PartialJSON()
+    for i in range(0, len(text), 5):
+        parser.feed(text[i:i + 5])
+    assert parser.complete()
+    assert parser.value() == {"feedback": "Good", "score": 8}
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"feedback": "Clear answer", "sco', {"feedback": "Clear answer"}),
+    ('{"feedback": "Clear answer", "score":', {"feedback": "Clear answer", "score": None}),
+    ('{"feedback": "Clear ans', {"feedback": "Clear ans"}),
+    ('["a", "b", ["c"', ["a", "b", ["c"]]),
+])
+def test_partial_json_closes_truncated_documents(text, expected):
+    parser = structured.PartialJSON().feed(text)
+    assert not parser.complete()
+    assert parser.value() == expected
+
+
+def test_partial_json_can_drop_a_cut_off_string():
+    parser = structured.PartialJSON().feed('["first", "seco')
+    assert parser.value(partial_strings=False) == ["first"]
+
+
+def test_parse_json_outcomes():
+    assert structured.parse_json('```json\n{"a": 1}\n```') == ({"a": 1}, "json")
+    assert structured.parse_json('Sure! {"a": [1, 2') == ({"a": [1, 2]}, "repaired")
+    assert structured.parse_json("no json here") == (None, "failed")
+
+
+@pytest.mark.parametrize("text, expected, outcome", [
+    (json.dumps({"questions": ["1. What is a thread?", "2. What is a process?"]}),
+     ["What is a thread?", "What is a process?"], "json"),
+    ('[{"question": "Q1: Why tests?"}]', ["Why tests?"], "json"),
+    ('{"questions": ["What is a thread?", "What is a pro', ["What is a thread?"], "repaired"),
+    ("Here you go:\n1. What is a thread?\n2) What is a process?\n- Why cache?",
+     ["What is a thread?", "What is a process?", "Why cache?"], "text"),
+    ("I can't help with that.", [], "failed"),
+])
+def test_parse_questions(text, expected, outcome):
+    assert structured.parse_questions(text) == (expected, outcome)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"score": 7}', 7),
+    ('{"score": 7.6}', 8),
+    ('{"score": "6/10"}', 6),
+    ('{"score": "9"}', 9),
+    ('{"score": 14}', 10),
+    ("Score: 8/10", 8),
+    ("Score - 5", 5),
+    ("I'd give this 6 out of 10.", 6),
+    ("This answer deserves a score of 9", 9),
+    ("The score is 4 out of 10", 4),
+    ("No number anywhere", None),
+    ("", None),
+    (None, None),
+])
+def test_parse_score(text, expected):
+    assert structured.parse_score(text) == expected
+
+
+def test_parse_evaluation_json():
+    text = json.dumps({"feedback": " Solid. ", "score": "7/10", "suggestions": ["Add an example", "Be brief"]})
+    assert structured.parse_evaluation(text) == ("Solid.", 7, "Add an example; Be brief", "json")
+
+
+def test_parse_evaluation_takes_the_score_from_feedback_when_missing():
+    text = '{"feedback": "Decent, score of 6", "suggestions": "More depth"}'
+    assert structured.parse_evaluation(text) == ("Decent, score of 6", 6, "More depth", "json")
+
+
+def test_parse_evaluation_plain_text():
+    text = "Good structure.\nScore: 7/10\nSuggestions: add an example."
+    assert structured.parse_evaluation(text) == (text, 7, "", "text")
+    assert structured.parse_evaluation("Thanks!") == ("Thanks!", None, "", "failed")
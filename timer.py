@@ -0,0 +1,64 @@
+import time
+import streamlit as st
+
+# Per-question timer. The server only keeps a monotonic deadline; the visible
+# countdown ticks in the browser, and a small fragment checks the deadline so
+# a timeout doesn't need whole-script reruns every second.
+QUESTION_TIME_LIMIT = 300  # 5 minutes per question
+CHECK_INTERVAL = 2  # seconds between server-side deadline checks
+
+COUNTDOWN_HTML = """
+<div id="timer" style="font-family: Arial, sans-serif; font-size: 1rem;"></div>
+<script>
+    let remaining = __SECONDS__;
+    const el = document.getElementById("timer");
+    const render = () => {
+        el.textContent = "Time remaining: " + Math.floor(remaining / 60) + ":" + String(remaining % 60).padStart(2, "0");
+    };
+    render();
+    const handle = setInterval(() => {
+        remaining = Math.max(0, remaining - 1);
+        render();
+        if (remaining === 0) clearInterval(handle);
+    }, 1000);
+</script>
+"""
+
+
+def start_question_timer(budget=QUESTION_TIME_LIMIT):
+    st.session_state.question_deadline = time.monotonic() + budget
+
+
+def time_remaining():
+    deadline = st.session_state.get("question_deadline")
+    if deadline is None:
+        return QUESTION_TIME_LIMIT
+    return max(0.0, deadline - time.monotonic())
+
+
+def timer_expired():
+    deadline = st.session_state.get("question_deadline")
+    return deadline is not None and time.monotonic() >= deadline
+
+
+@st.fragment(run_every=CHECK_INTERVAL)
+def _watch_deadline():
+    # Reruns only this fragment until the deadline passes, then the whole app
+    # so the timeout is handled like any other interaction
+    if timer_expired():
+        st.rerun(scope="app")
+
+
+def _embed_html(html, height):
+    # st.iframe replaces components.html, which newer Streamlit releases deprecate
+    # and will drop; releases before st.iframe only have the latter
+    if hasattr(st, "iframe"):
+        st.iframe(html, height=height)
+    else:
+        import streamlit.components.v1 as components
+        components.html(html, height=height)
+
+
+def render_countdown():
+    _embed_html(COUNTDOWN_HTML.replace("__SECONDS__", str(int(time_remaining()))), height=30)
+    _watch_deadline()
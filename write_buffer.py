@@ -0,0 +1,116 @@
+import os
+import atexit
+import threading
+
+import db
+import storage
+
+# Write-behind buffer for answer results: history inserts and leaderboard
+# increments from every session are grouped into one transaction per flush.
+#
+# Durability modes (WRITE_BEHIND_DURABILITY):
+#   "immediate"   - flush on every answer; history and leaderboard still share one commit
+#   "buffered"    - flush at MAX_ROWS pending answers or MAX_DELAY seconds after the first one
+#   "session_end" - hold writes until the interview ends (MAX_ROWS still bounds memory)
+# Every mode flushes when an interview ends and at process exit. With a shared
+# store the flushed totals are also added to the shared leaderboard; if the store
+# is down they are kept and added on a later flush.
+DURABILITY = os.getenv("WRITE_BEHIND_DURABILITY", "buffered")
+MAX_ROWS = int(os.getenv("WRITE_BEHIND_MAX_ROWS", "50"))
+MAX_DELAY = float(os.getenv("WRITE_BEHIND_MAX_DELAY", "2"))
+
+
+class WriteBehindBuffer:
+    def __init__(self, durability=DURABILITY, max_rows=MAX_ROWS, max_delay=MAX_DELAY):
+        if durability not in ("immediate", "buffered", "session_end"):
+            raise ValueError(f"Unknown write-behind durability mode: {durability}")
+        self.durability = durability
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.commits = 0
+        self._history = []
+        self._scores = {}  # user_id -> [total_score, attempts]
+        self._unshared = {}  # committed totals not yet added to the shared store
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timer = None
+
+    def record_answer(self, user_id, entry):
+        with self._lock:
+            self._history.append(db.history_row(user_id, entry))
+            _add_totals(self._scores, {user_id: (entry["score"], 1)})
+            flush_now = self.durability == "immediate" or len(self._history) >= self.max_rows
+            if not flush_now and self.durability == "buffered" and self._timer is None:
+                self._timer = threading.Timer(self.max_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if flush_now:
+            self.flush()
+
+    def pending(self):
+        with self._lock:
+            return len(self._history)
+
+    def flush(self):
+        # _flush_lock keeps flushes in order, so a failed batch is retried before newer ones
+        with self._flush_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                history, self._history = self._history, []
+                scores, self._scores = self._scores, {}
+            if not history:
+                self._share({})
+                return 0
+            try:
+                with db.transaction() as conn:
+                    conn.executemany(db.SQL_SAVE_HISTORY, history)
+                    conn.executemany(
+                        db.SQL_UPSERT_LEADERBOARD,
+                        [(user_id, total, attempts) for user_id, (total, attempts) in scores.items()]
+                    )
+            except Exception:
+                # Put the batch back in front of anything recorded meanwhile
+                with self._lock:
+                    self._history[:0] = history
+                    _add_totals(self._scores, scores)
+                raise
+            self.commits += 1
+            self._share(scores)
+        return len(history)
+
+    def _share(self, scores):
+        # Caller holds _flush_lock
+        if not storage.shared():
+            if scores:
+                db.invalidate_leaderboard_cache()
+            return
+        _add_totals(self._unshared, scores)
+        if not self._unshared:
+            return
+        try:
+            db.add_shared_scores(self._unshared)
+        except storage.UNAVAILABLE:
+            storage.ERRORS.inc(operation="leaderboard_add")
+            return
+        self._unshared = {}
+
+
+def _add_totals(into, scores):
+    for user_id, (total, attempts) in scores.items():
+        totals = into.setdefault(user_id, [0, 0])
+        totals[0] += total
+        totals[1] += attempts
+
+
+buffer = WriteBehindBuffer()
+atexit.register(buffer.flush)
+
+
+def record_answer(user_id, entry):
+    buffer.record_answer(user_id, entry)
+
+
+def flush():
+    return buffer.flush()